@@ -33,3 +33,4 @@ book2.authors.add(author2)
 book2.genres.add(genre1)
 
 print('Тестовые данные созданы успешно!')
+print('Для большого синтетического каталога: python manage.py generate_catalog --books 10000')
@@ -1,20 +1,83 @@
-from django.contrib import admin
-from .models import Book, Author, Publisher, Genre
+from django.contrib import admin, messages
+from django.db import transaction
+from django.db.models import Q
+from .models import Book, Author, Publisher, Genre, Reader, BookReservation
+from .roles import invalidate_roles
+from .search import search_by_name, search_readers
+from .services import close_reservations, extend_reservations
+from .templatetags.library_tags import cover_image
+
+
+class BookCountFieldListFilter(admin.RelatedFieldListFilter):
+    """Фильтр по связанной модели с числом книг, который листает варианты страницами.
+
+    Вместо всех записей справочника показывает per_page самых популярных
+    (по индексу -book_count) и ссылки на соседние страницы вариантов.
+    """
+    per_page = 20
+
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        # Номер страницы вариантов — не условие фильтрации, забираем его до разбора
+        self.page_kwarg = f'{field_path}_page'
+        try:
+            self.page = max(int(params.pop(self.page_kwarg, ['1'])[-1]), 1)
+        except ValueError:
+            self.page = 1
+        self.has_next_page = False
+        super().__init__(field, request, params, model, model_admin, field_path)
+
+    def field_choices(self, field, request, model_admin):
+        related = field.related_model._default_manager
+        ordering = ['-book_count', *field.related_model._meta.ordering, 'pk']
+        offset = (self.page - 1) * self.per_page
+        rows = list(related.order_by(*ordering)[offset:offset + self.per_page + 1])
+        self.has_next_page = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        # Выбранное значение показываем, даже если оно не попало на страницу
+        shown = {str(obj.pk) for obj in rows}
+        missing = [pk for pk in self.lookup_val or [] if pk not in shown]
+        if missing:
+            try:
+                rows = list(related.filter(pk__in=missing)) + rows
+            except (TypeError, ValueError):
+                pass
+        return [(obj.pk, f'{obj} ({obj.book_count})') for obj in rows]
+
+    def choices(self, changelist):
+        if self.page > 1:
+            yield {
+                'selected': False,
+                'query_string': changelist.get_query_string({self.page_kwarg: self.page - 1}),
+                'display': '← Предыдущие',
+            }
+        yield from super().choices(changelist)
+        if self.has_next_page:
+            yield {
+                'selected': False,
+                'query_string': changelist.get_query_string({self.page_kwarg: self.page + 1}),
+                'display': 'Следующие →',
+            }
+
+
+class NameSearchMixin:
+    """Поиск в списке и автодополнении по началу имени через индекс search_name"""
+    search_fields = ('search_name',)
+
+    def get_search_results(self, request, queryset, search_term):
+        return search_by_name(queryset, search_term), False
+
 
 @admin.register(Genre)
-class GenreAdmin(admin.ModelAdmin):
-    list_display = ('name', 'description_preview')
-    search_fields = ('name', 'description')
-    list_filter = ('name',)
+class GenreAdmin(NameSearchMixin, admin.ModelAdmin):
+    list_display = ('name', 'book_count', 'description_preview')
     
     def description_preview(self, obj):
         return obj.description[:100] + '...' if len(obj.description) > 100 else obj.description
     description_preview.short_description = 'Описание'
 
 @admin.register(Author)
-class AuthorAdmin(admin.ModelAdmin):
-    list_display = ('full_name', 'birth_date', 'get_age', 'biography_preview')
-    search_fields = ('full_name', 'biography')
+class AuthorAdmin(NameSearchMixin, admin.ModelAdmin):
+    list_display = ('full_name', 'birth_date', 'get_age', 'book_count', 'biography_preview')
     list_filter = ('birth_date',)
     date_hierarchy = 'birth_date'
     
@@ -27,9 +90,8 @@ class AuthorAdmin(admin.ModelAdmin):
     biography_preview.short_description = 'Биография'
 
 @admin.register(Publisher)
-class PublisherAdmin(admin.ModelAdmin):
-    list_display = ('name', 'country', 'foundation_year')
-    search_fields = ('name', 'country')
+class PublisherAdmin(NameSearchMixin, admin.ModelAdmin):
+    list_display = ('name', 'country', 'foundation_year', 'book_count')
     list_filter = ('country', 'foundation_year')
 
 @admin.register(Book)
@@ -46,11 +108,12 @@ class BookAdmin(admin.ModelAdmin):
     search_fields = ('title', 'isbn', 'description', 'authors__full_name', 'publisher__name')
     list_filter = (
         'publication_year', 
-        'publisher', 
-        'genres',
-        'authors'
+        ('publisher', BookCountFieldListFilter),
+        ('genres', BookCountFieldListFilter),
+        ('authors', BookCountFieldListFilter),
     )
-    filter_horizontal = ('authors', 'genres')
+    # Справочники выбираются поиском вместо <select> со всеми записями
+    autocomplete_fields = ('authors', 'publisher', 'genres')
     readonly_fields = ('cover_preview',)
     
     def get_authors_list(self, obj):
@@ -68,10 +131,83 @@ class BookAdmin(admin.ModelAdmin):
     
     def cover_preview(self, obj):
         if obj.cover:
-            return f'<img src="{obj.cover.url}" style="max-height: 200px;" />'
+            return cover_image(obj, 200, css_class='cover-preview')
         return "Нет обложки"
-    cover_preview.allow_tags = True
     cover_preview.short_description = 'Превью обложки'
     
     def get_queryset(self, request):
-        return super().get_queryset(request).prefetch_related('authors', 'genres').select_related('publisher')
\ No newline at end of file
+        return super().get_queryset(request).prefetch_related('authors', 'genres').select_related('publisher')
+
+
+@admin.register(BookReservation)
+class BookReservationAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'book', 'reader', 'status', 'reservation_date', 'end_date')
+    list_filter = ('status',)
+    list_select_related = ('book', 'reader')
+    raw_id_fields = ('book', 'reader')
+    # Поиск по ISBN или по началу ФИО/email читателя (см. get_search_results)
+    search_fields = ('=book__isbn', 'reader__search_name')
+    # Иерархия и сортировка по индексу end_date; без полного COUNT(*) по таблице
+    date_hierarchy = 'end_date'
+    ordering = ('-end_date',)
+    show_full_result_count = False
+    actions = ('complete_reservations', 'cancel_reservations', 'extend_reservations')
+
+    def get_search_results(self, request, queryset, search_term):
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        readers = search_readers(search_term).values('pk')
+        return queryset.filter(Q(book__isbn=search_term) | Q(reader__in=readers)), False
+
+    # Массовые действия выполняются одним UPDATE без сохранения каждой брони
+
+    @admin.action(description='Завершить выбранные активные брони')
+    def complete_reservations(self, request, queryset):
+        closed = close_reservations(queryset, 'completed')
+        self.message_user(request, f'Завершено броней: {closed}', messages.SUCCESS)
+
+    @admin.action(description='Отменить выбранные активные брони')
+    def cancel_reservations(self, request, queryset):
+        closed = close_reservations(queryset, 'canceled')
+        self.message_user(request, f'Отменено броней: {closed}', messages.SUCCESS)
+
+    @admin.action(description='Продлить выбранные активные брони на 14 дней')
+    def extend_reservations(self, request, queryset):
+        extended = extend_reservations(queryset, days=14)
+        self.message_user(request, f'Продлено броней: {extended}', messages.SUCCESS)
+
+
+@admin.register(Reader)
+class ReaderAdmin(admin.ModelAdmin):
+    list_display = ('full_name', 'email', 'phone', 'role', 'user', 'registration_date')
+    list_filter = ('role',)
+    list_select_related = ('user',)
+    raw_id_fields = ('user',)
+    # Поиск по началу ФИО, email или телефона (см. get_search_results)
+    search_fields = ('search_name', 'search_email', 'phone_digits')
+    date_hierarchy = 'registration_date'
+    show_full_result_count = False
+    actions = ('make_readers', 'make_guests')
+
+    def get_search_results(self, request, queryset, search_term):
+        # Поиск по префиксу нормализованных ключей использует индексы, а не LIKE '%...%'
+        if not search_term:
+            return queryset, False
+        return search_readers(search_term, queryset), False
+
+    def set_role(self, request, queryset, role):
+        with transaction.atomic():
+            user_ids = list(queryset.values_list('user_id', flat=True))
+            updated = queryset.update(role=role)
+        # update() не вызывает сигналы: закэшированные роли сбрасываются явно
+        invalidate_roles(user_ids)
+        self.message_user(request, f'Роль изменена у читателей: {updated}', messages.SUCCESS)
+
+    @admin.action(description='Назначить роль «Читатель»')
+    def make_readers(self, request, queryset):
+        self.set_role(request, queryset, 'reader')
+
+    @admin.action(description='Назначить роль «Гость»')
+    def make_guests(self, request, queryset):
+        self.set_role(request, queryset, 'guest')
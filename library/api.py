@@ -0,0 +1,159 @@
+from collections import defaultdict
+
+from .models import Author, Book, Genre, Publisher
+from .pagination import CursorPaginator
+
+# Размер страницы по умолчанию и предел для ?limit= и ?ids=
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+
+class ApiError(Exception):
+    """Некорректные параметры запроса (ответ 400)"""
+
+
+class Resource:
+    """Описание ресурса API: поля ответа -> колонки values() и массивы связей.
+
+    fields — имя в ответе -> путь поля ORM; arrays — имя в ответе ->
+    (ManyToManyField модели, поле подписи связанной записи).
+    """
+
+    def __init__(self, model, fields, default_fields, ordering, arrays=None):
+        self.model = model
+        self.fields = fields
+        self.arrays = arrays or {}
+        self.default_fields = default_fields
+        self.ordering = ordering
+
+    @property
+    def available_fields(self):
+        return [*self.fields, *self.arrays]
+
+    def parse_fields(self, value):
+        if not value:
+            return list(self.default_fields)
+        requested = list(dict.fromkeys(name.strip() for name in value.split(',') if name.strip()))
+        unknown = [name for name in requested if name not in self.fields and name not in self.arrays]
+        if unknown:
+            raise ApiError(f"Неизвестные поля: {', '.join(unknown)}. Доступны: {', '.join(self.available_fields)}")
+        return requested
+
+    def rows(self, queryset, fields):
+        """values() только нужных колонок; колонки сортировки нужны курсору"""
+        lookups = {self.fields[name] for name in fields if name in self.fields}
+        lookups |= {'id', *(field.lstrip('-') for field in self.ordering)}
+        return queryset.values(*lookups)
+
+    def serialize(self, rows, fields):
+        """Строки values() -> словари ответа; массивы связей — одним запросом на связь"""
+        arrays = {name: self.related(name, [row['id'] for row in rows]) for name in fields if name in self.arrays}
+        return [
+            {
+                name: arrays[name].get(row['id'], []) if name in arrays else row[self.fields[name]]
+                for name in fields
+            }
+            for row in rows
+        ]
+
+    def related(self, name, ids):
+        field_name, label = self.arrays[name]
+        field = self.model._meta.get_field(field_name)
+        source, target = field.m2m_field_name(), field.m2m_reverse_field_name()
+        links = (
+            field.remote_field.through.objects
+            .filter(**{f'{source}_id__in': ids})
+            .order_by('pk')
+            .values_list(f'{source}_id', f'{target}_id', f'{target}__{label}')
+        )
+        grouped = defaultdict(list)
+        for owner_id, related_id, value in links:
+            grouped[owner_id].append({'id': related_id, label: value})
+        return grouped
+
+
+RESOURCES = {
+    'books': Resource(
+        Book,
+        fields={
+            'id': 'id', 'isbn': 'isbn', 'title': 'title', 'description': 'description',
+            'publication_year': 'publication_year', 'publisher_id': 'publisher_id',
+            'publisher': 'publisher__name', 'active_reservations': 'active_reservations',
+            'updated_at': 'updated_at',
+        },
+        arrays={'authors': ('authors', 'full_name'), 'genres': ('genres', 'name')},
+        default_fields=['id', 'isbn', 'title', 'publication_year', 'publisher', 'authors', 'genres', 'active_reservations'],
+        ordering=['title'],
+    ),
+    'authors': Resource(
+        Author,
+        fields={
+            'id': 'id', 'full_name': 'full_name', 'birth_date': 'birth_date', 'biography': 'biography',
+            'book_count': 'book_count', 'updated_at': 'updated_at',
+        },
+        default_fields=['id', 'full_name', 'birth_date', 'book_count'],
+        ordering=['full_name'],
+    ),
+    'genres': Resource(
+        Genre,
+        fields={
+            'id': 'id', 'name': 'name', 'description': 'description',
+            'book_count': 'book_count', 'updated_at': 'updated_at',
+        },
+        default_fields=['id', 'name', 'book_count'],
+        ordering=['name'],
+    ),
+    'publishers': Resource(
+        Publisher,
+        fields={
+            'id': 'id', 'name': 'name', 'country': 'country', 'foundation_year': 'foundation_year',
+            'book_count': 'book_count', 'updated_at': 'updated_at',
+        },
+        default_fields=['id', 'name', 'country', 'book_count'],
+        ordering=['name'],
+    ),
+}
+
+
+def parse_ids(value):
+    try:
+        ids = list(dict.fromkeys(int(part) for part in value.split(',') if part.strip()))
+    except ValueError:
+        raise ApiError('ids должен быть списком целых чисел через запятую')
+    if len(ids) > MAX_LIMIT:
+        raise ApiError(f'Не больше {MAX_LIMIT} ids за запрос')
+    return ids
+
+
+def parse_limit(value):
+    try:
+        limit = int(value) if value else DEFAULT_LIMIT
+    except ValueError:
+        raise ApiError('limit должен быть числом')
+    return min(max(limit, 1), MAX_LIMIT)
+
+
+def fetch(resource_name, params):
+    """Данные ответа: {'results', 'next_cursor', 'previous_cursor'}.
+
+    С ?ids= записи выбираются одним запросом без пагинации, иначе —
+    keyset-страница по ?cursor= (см. CursorPaginator).
+    """
+    resource = RESOURCES[resource_name]
+    fields = resource.parse_fields(params.get('fields'))
+    queryset = resource.model.objects.order_by()
+    if params.get('ids'):
+        ids = parse_ids(params['ids'])
+        rows = list(resource.rows(queryset.filter(pk__in=ids), fields))
+        # Порядок ответа — порядок ids в запросе
+        position = {pk: index for index, pk in enumerate(ids)}
+        rows.sort(key=lambda row: position[row['id']])
+        return {'results': resource.serialize(rows, fields), 'next_cursor': None, 'previous_cursor': None}
+
+    paginator = CursorPaginator(resource.rows(queryset, fields), resource.ordering, parse_limit(params.get('limit')))
+    page = paginator.page(params.get('cursor'))
+    return {
+        'results': resource.serialize(page.object_list, fields),
+        'next_cursor': page.next_cursor,
+        'previous_cursor': page.previous_cursor,
+    }
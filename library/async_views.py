@@ -0,0 +1,83 @@
+from asgiref.sync import sync_to_async
+from django.core.paginator import Page, Paginator
+from django.db.models import aprefetch_related_objects
+from django.http import Http404, JsonResponse
+from django.shortcuts import render
+
+from .conditions import acatalog_condition
+from .models import Book
+from .pagination import CursorPaginator, InvalidCursor
+from .search import BookSearchResults
+from .views import BookDetailView, BookListView, lookup_readers
+
+
+async def alist(queryset):
+    return [obj async for obj in queryset.aiterator()]
+
+
+async def apage(queryset, per_page, number):
+    """Номерная страница на async ORM: COUNT, затем строки страницы.
+
+    Async ORM выполняет запросы через sync_to_async в общем потоке, поэтому
+    они идут последовательно; выигрыш в том, что цикл событий не блокируется.
+    """
+    try:
+        number = max(int(number or 1), 1)
+    except (TypeError, ValueError):
+        number = 1
+    paginator = Paginator(queryset, per_page)
+    offset = (number - 1) * per_page
+    paginator.count = await queryset.acount()
+    rows = await alist(queryset[offset:offset + per_page])
+    if not rows and number > paginator.num_pages:
+        # Как Paginator.get_page: номер за концом списка ведет на последнюю страницу
+        number = paginator.num_pages
+        offset = (number - 1) * per_page
+        rows = await alist(queryset[offset:offset + per_page])
+    return Page(rows, number, paginator)
+
+
+async def book_list(request):
+    """Каталог книг на async ORM; данные и шаблон те же, что у BookListView"""
+    search_query = request.GET.get('q', '').strip()
+    per_page = BookListView.paginate_by
+    queryset = Book.objects.select_related('publisher')
+    if search_query:
+        # Поиск читает FTS-индекс сырым курсором, поэтому выполняется в потоке
+        paginator = Paginator(BookSearchResults(search_query, queryset), per_page)
+        page_obj = await sync_to_async(paginator.get_page)(request.GET.get('page'))
+    elif 'cursor' in request.GET:
+        paginator = CursorPaginator(queryset, BookListView.ordering, per_page)
+        try:
+            page_obj = await sync_to_async(paginator.page)(request.GET.get('cursor'))
+        except InvalidCursor as e:
+            raise Http404(str(e))
+    else:
+        page_obj = await apage(queryset.order_by(*BookListView.ordering, 'pk'), per_page, request.GET.get('page'))
+
+    # Шаблон читает сессию и кэш карточек синхронно
+    return await sync_to_async(render)(request, BookListView.template_name, {
+        'books': page_obj.object_list,
+        'page_obj': page_obj,
+        'is_paginated': page_obj.has_other_pages(),
+        'search_query': search_query,
+    })
+
+
+@acatalog_condition('book')
+async def book_detail(request, pk):
+    """Страница книги на async ORM; авторы и жанры подгружаются одним prefetch"""
+    try:
+        book = await Book.objects.select_related('publisher').aget(pk=pk)
+    except Book.DoesNotExist:
+        raise Http404('Книга не найдена')
+    await aprefetch_related_objects([book], 'authors', 'genres')
+    return await sync_to_async(render)(request, BookDetailView.template_name, {'book': book})
+
+
+async def reader_lookup(request):
+    """JSON-поиск читателей для автодополнения без занятого на время запроса потока"""
+    readers = lookup_readers(request.GET.get('q', '').strip())
+    return JsonResponse({
+        'results': [{'id': reader.pk, 'text': reader.lookup_label} async for reader in readers.aiterator()]
+    })
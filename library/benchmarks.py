@@ -0,0 +1,48 @@
+import json
+import math
+import platform
+import statistics
+
+from django.utils import timezone
+
+
+def percentile(values, p):
+    """Перцентиль методом ближайшего ранга"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(p / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(latencies_ms):
+    """Сводка по задержкам в миллисекундах"""
+    if not latencies_ms:
+        return {'count': 0}
+    return {
+        'count': len(latencies_ms),
+        'mean_ms': round(statistics.fmean(latencies_ms), 3),
+        'p50_ms': round(percentile(latencies_ms, 50), 3),
+        'p95_ms': round(percentile(latencies_ms, 95), 3),
+        'p99_ms': round(percentile(latencies_ms, 99), 3),
+        'max_ms': round(max(latencies_ms), 3),
+    }
+
+
+def write_results(path, name, results, **meta):
+    """Сохраняет результаты прогона в JSON, пригодный для сравнения прогонов"""
+    payload = {
+        'benchmark': name,
+        'created_at': timezone.now().isoformat(),
+        'python': platform.python_version(),
+        'meta': meta,
+        'results': results,
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, ensure_ascii=False, indent=2)
+    return payload
+
+
+def load_results(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)['results']
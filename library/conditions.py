@@ -0,0 +1,79 @@
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.db.models import Count, Max
+from django.views.decorators.http import condition
+
+from .models import Author, Book, Genre, Publisher
+
+
+def _latest(*values):
+    values = [value for value in values if value is not None]
+    return max(values) if values else None
+
+
+def _book_state(pk):
+    # Изменения авторов, жанров, издательства и доступности уже отражены
+    # в updated_at книги (см. signals.py), поэтому хватает одной колонки
+    updated_at = Book.objects.filter(pk=pk).values_list('updated_at', flat=True).first()
+    return updated_at, 0
+
+
+def _catalog_state(model, pk, books_lookup):
+    state = model.objects.filter(pk=pk).aggregate(
+        own=Max('updated_at'),
+        books=Max(f'{books_lookup}__updated_at'),
+        total=Count(books_lookup),
+    )
+    return _latest(state['own'], state['books']), state['total']
+
+
+STATE_FUNCTIONS = {
+    'book': _book_state,
+    'author': lambda pk: _catalog_state(Author, pk, 'book'),
+    'publisher': lambda pk: _catalog_state(Publisher, pk, 'book'),
+    'genre': lambda pk: _catalog_state(Genre, pk, 'book'),
+}
+
+
+def _page_state(request, kind, pk):
+    """Считает состояние один раз на запрос: его используют и ETag, и Last-Modified"""
+    cache = request.__dict__.setdefault('_catalog_state', {})
+    if (kind, pk) not in cache:
+        cache[kind, pk] = STATE_FUNCTIONS[kind](pk)
+    return cache[kind, pk]
+
+
+def catalog_condition(kind):
+    """Декоратор условного GET: 304 без загрузки связанных списков страницы"""
+
+    def etag(request, pk, **kwargs):
+        updated_at, total = _page_state(request, kind, pk)
+        if updated_at is None:
+            return None
+        return f'{kind}-{pk}-{updated_at.timestamp():.6f}-{total}'
+
+    def last_modified(request, pk, **kwargs):
+        return _page_state(request, kind, pk)[0]
+
+    return condition(etag_func=etag, last_modified_func=last_modified)
+
+
+def acatalog_condition(kind):
+    """catalog_condition для async-представлений.
+
+    condition() вызывает функции ETag и Last-Modified синхронно, поэтому
+    состояние заранее считается в потоке и кладется в кэш запроса.
+    """
+
+    def decorator(view):
+        conditional = catalog_condition(kind)(view)
+
+        @wraps(view)
+        async def inner(request, pk, **kwargs):
+            await sync_to_async(_page_state)(request, kind, pk)
+            return await conditional(request, pk=pk, **kwargs)
+
+        return inner
+
+    return decorator
@@ -0,0 +1,45 @@
+import sqlite3
+
+from django.conf import settings
+
+# Прагмы продакшен-профиля SQLite (LIBRARY_DB_PROFILE=production):
+# WAL разрешает чтение во время записи, synchronous=NORMAL в режиме WAL
+# не теряет целостность и убирает fsync на каждый коммит
+PRODUCTION_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    # Отрицательное значение — размер в КиБ, а не в страницах
+    'cache_size': -64 * 1024,
+    'busy_timeout': 20000,
+    'temp_store': 'MEMORY',
+}
+
+
+def sqlite_pragmas(settings_dict):
+    """Прагмы соединения: ключ PRAGMAS псевдонима или общий SQLITE_PRAGMAS"""
+    if 'PRAGMAS' in settings_dict:
+        return settings_dict['PRAGMAS']
+    return getattr(settings, 'SQLITE_PRAGMAS', {})
+
+
+def apply_sqlite_pragmas(connection):
+    """Выполняет PRAGMA для только что открытого соединения SQLite"""
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = sqlite_pragmas(connection.settings_dict)
+    if not pragmas:
+        return
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def copy_sqlite(connection, path):
+    """Копирует базу соединения в файл через backup API (согласованный снимок)"""
+    connection.ensure_connection()
+    target = sqlite3.connect(path)
+    try:
+        connection.connection.backup(target)
+    finally:
+        target.close()
@@ -0,0 +1,81 @@
+import csv
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Book, BookReservation, Reader
+
+FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+}
+
+
+def filter_reservations(queryset, params):
+    """Фильтры списка броней; общие для ReservationListView и выгрузки"""
+    status = params.get('status', '')
+    if status:
+        queryset = queryset.filter(status=status)
+    return queryset
+
+
+def _reservations(params):
+    return filter_reservations(BookReservation.objects.order_by('-reservation_date', '-pk'), params)
+
+
+def _books(params):
+    return Book.objects.order_by('pk')
+
+
+def _readers(params):
+    return Reader.objects.order_by('pk')
+
+
+# Набор данных: (queryset по параметрам запроса, колонки values_list)
+DATASETS = {
+    'reservations': (_reservations, [
+        'id', 'book_id', 'book__isbn', 'book__title', 'reader_id', 'reader__full_name',
+        'reservation_date', 'end_date', 'status',
+    ]),
+    'books': (_books, [
+        'id', 'isbn', 'title', 'publication_year', 'publisher__name', 'active_reservations', 'updated_at',
+    ]),
+    'readers': (_readers, [
+        'id', 'full_name', 'email', 'phone', 'birth_date', 'registration_date', 'role',
+    ]),
+}
+
+
+class Echo:
+    """Псевдобуфер для csv.writer: возвращает строку вместо записи"""
+
+    def write(self, value):
+        return value
+
+
+def _csv_lines(fields, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(fields)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def _jsonl_lines(fields, rows):
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    for row in rows:
+        yield encoder.encode(dict(zip(fields, row))) + '\n'
+
+
+def iter_export(dataset, fmt='csv', params=None, chunk_size=2000):
+    """Построчно отдает выгрузку; в памяти держится не больше chunk_size строк.
+
+    values_list().iterator() не создает экземпляры моделей и читает
+    результат курсором пачками по chunk_size.
+    """
+    if dataset not in DATASETS:
+        raise ValueError(f'Неизвестный набор данных: {dataset}')
+    if fmt not in FORMATS:
+        raise ValueError(f'Неизвестный формат: {fmt}')
+    get_queryset, fields = DATASETS[dataset]
+    rows = get_queryset(params or {}).values_list(*fields).iterator(chunk_size=chunk_size)
+    lines = _csv_lines if fmt == 'csv' else _jsonl_lines
+    return lines(fields, rows)
@@ -1,9 +1,10 @@
 from django import forms
-from .models import Book, Author
+from .models import Book
 from .models import Reader, BookReservation, User
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 from django.contrib.auth.forms import UserCreationForm as BaseUserCreationForm
+from django.urls import reverse_lazy
 
 class LoginForm(forms.Form):
     username = forms.CharField(
@@ -72,12 +73,85 @@ class ReaderForm(forms.ModelForm):
             'email': 'Email',
         }
 
+class ReaderAutocompleteWidget(forms.Widget):
+    """Выбор читателя поиском через JSON-эндпоинт вместо <select> со всеми читателями"""
+    template_name = 'library/widgets/reader_autocomplete.html'
+
+    class Media:
+        js = ['library/js/autocomplete.js']
+
+    def __init__(self, attrs=None, url=reverse_lazy('library:reader_lookup')):
+        super().__init__(attrs)
+        self.url = url
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        reader = None
+        if value:
+            try:
+                reader = Reader.objects.filter(pk=value).only('full_name', 'email').first()
+            except (TypeError, ValueError):
+                pass
+        widget_attrs = context['widget']['attrs']
+        widget_attrs['class'] = f"{widget_attrs.get('class', '')} autocomplete-input".strip()
+        context['widget'].update({
+            'url': str(self.url),
+            'label': reader.lookup_label if reader else '',
+        })
+        return context
+
+
+class CatalogAutocompleteMixin:
+    """<select> только с выбранными записями; остальные ищутся через JSON-эндпоинт.
+
+    Варианты справочника не перебираются целиком: при выводе формы
+    запрашиваются только записи с выбранными pk.
+    """
+    template_name = 'library/widgets/catalog_autocomplete.html'
+
+    class Media:
+        js = ['library/js/autocomplete.js']
+
+    def __init__(self, url, attrs=None):
+        super().__init__(attrs)
+        self.url = url
+
+    def optgroups(self, name, value, attrs=None):
+        selected = [pk for pk in value if pk not in (None, '')]
+        options = []
+        if not self.allow_multiple_selected and not self.is_required:
+            options.append(self.create_option(name, '', self.choices.field.empty_label, not selected, 0))
+        if selected:
+            try:
+                rows = list(self.choices.queryset.filter(pk__in=selected))
+            except (TypeError, ValueError):
+                rows = []
+            for row in rows:
+                options.append(self.create_option(name, row.pk, str(row), True, len(options)))
+        return [(None, options, 0)]
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        widget_attrs = context['widget']['attrs']
+        widget_attrs['class'] = f"{widget_attrs.get('class', '')} autocomplete-value".strip()
+        context['widget']['url'] = str(self.url)
+        return context
+
+
+class CatalogAutocompleteSelect(CatalogAutocompleteMixin, forms.Select):
+    pass
+
+
+class CatalogAutocompleteSelectMultiple(CatalogAutocompleteMixin, forms.SelectMultiple):
+    pass
+
+
 class BookReservationForm(forms.ModelForm):
     class Meta:
         model = BookReservation
         fields = ['reader']
         widgets = {
-            'reader': forms.Select(attrs={'class': 'form-select'}),
+            'reader': ReaderAutocompleteWidget(attrs={'class': 'form-control'}),
         }
         labels = {
             'reader': 'Читатель',
@@ -94,20 +168,21 @@ class BookReservationForm(forms.ModelForm):
                 initial=self.book,
                 widget=forms.HiddenInput()
             )
+        else:
+            self.fields['book'] = forms.ModelChoiceField(
+                queryset=Book.objects.filter(active_reservations=0),
+                label='Книга',
+                widget=forms.Select(attrs={'class': 'form-select'})
+            )
     
     def clean(self):
         cleaned_data = super().clean()
         book = cleaned_data.get('book') or self.book
-        reader = cleaned_data.get('reader')
         
-        if book and reader:
-            # Проверяем, что книга доступна для бронирования
-            if book.reservations.filter(status='active').exists():
-                raise ValidationError("Эта книга уже забронирована")
-            
-            # Проверяем, что у читателя нет активных броней на эту книгу
-            if reader.has_active_reservation(book):
-                raise ValidationError("У этого читателя уже есть активная бронь на эту книгу")
+        # Быстрая проверка по уже загруженному счетчику; окончательно книгу
+        # захватывает services.reserve_book, поэтому гонки здесь не страшны
+        if book and not book.is_available():
+            raise ValidationError("Эта книга уже забронирована")
         
         return cleaned_data
 
@@ -128,16 +203,20 @@ class BookForm(forms.ModelForm):
                 'rows': 4
             }),
             'cover': forms.FileInput(attrs={'class': 'form-control'}),
-            'authors': forms.SelectMultiple(attrs={'class': 'form-control'}),
-            'publisher': forms.Select(attrs={'class': 'form-control'}),
-            'genres': forms.SelectMultiple(attrs={'class': 'form-control'}),
+            # Справочники выбираются поиском: в HTML попадают только выбранные записи
+            'authors': CatalogAutocompleteSelectMultiple(
+                reverse_lazy('library:catalog_lookup', args=['authors']), attrs={'class': 'form-control'}
+            ),
+            'publisher': CatalogAutocompleteSelect(
+                reverse_lazy('library:catalog_lookup', args=['publishers']), attrs={'class': 'form-control'}
+            ),
+            'genres': CatalogAutocompleteSelectMultiple(
+                reverse_lazy('library:catalog_lookup', args=['genres']), attrs={'class': 'form-control'}
+            ),
         }
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        # Настройка выпадающих списков
-        self.fields['authors'].queryset = Author.objects.all()
-        
         # Добавляем пустой вариант для выбора
         self.fields['publisher'].empty_label = "Выберите издательство"
         
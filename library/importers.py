@@ -0,0 +1,259 @@
+import csv
+import json
+import os
+import time
+from datetime import date
+
+from django.db import transaction
+
+from . import search
+from .models import Author, Book, Genre, Publisher, normalize_search_text
+from .services import adjust_book_counts
+
+# Разделители списков в CSV: "Пушкин|1799-06-06; Жуковский"
+LIST_SEPARATOR = ';'
+DATE_SEPARATOR = '|'
+
+
+class CatalogImportError(Exception):
+    pass
+
+
+def _split(value):
+    return [item.strip() for item in (value or '').split(LIST_SEPARATOR) if item.strip()]
+
+
+def _parse_date(value):
+    try:
+        return date.fromisoformat(str(value).strip()) if value else None
+    except ValueError:
+        return None
+
+
+def _parse_author(value):
+    if isinstance(value, dict):
+        return str(value.get('full_name') or '').strip(), _parse_date(value.get('birth_date'))
+    name, _, birth_date = str(value).partition(DATE_SEPARATOR)
+    return name.strip(), _parse_date(birth_date)
+
+
+def _as_list(value):
+    return _split(value) if isinstance(value, str) else list(value or [])
+
+
+def iter_csv(path):
+    with open(path, newline='', encoding='utf-8') as source:
+        yield from csv.DictReader(source)
+
+
+def iter_jsonl(path):
+    with open(path, encoding='utf-8') as source:
+        for line in source:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def iter_records(path, fmt=None):
+    """Потоково читает записи каталога из CSV или JSONL"""
+    fmt = fmt or os.path.splitext(path)[1].lstrip('.').lower()
+    if fmt == 'csv':
+        return iter_csv(path)
+    if fmt in ('jsonl', 'ndjson', 'json'):
+        return iter_jsonl(path)
+    raise CatalogImportError(f'Неизвестный формат файла: {fmt}')
+
+
+class CatalogImporter:
+    """Пакетный импорт каталога.
+
+    Авторы, жанры и издательства дедуплицируются через словари имя -> id,
+    книги создаются bulk_create пачками, связи M2M вставляются напрямую в
+    промежуточные таблицы. Каждая пачка — отдельная транзакция, после нее
+    сохраняется контрольная точка, с которой импорт можно продолжить.
+    """
+
+    def __init__(self, batch_size=2000, default_birth_date=date(1900, 1, 1),
+                 checkpoint=None, progress=None):
+        self.batch_size = batch_size
+        self.default_birth_date = default_birth_date
+        self.checkpoint = checkpoint
+        self.progress = progress
+        self.stats = {'processed': 0, 'created': 0, 'skipped': 0, 'errors': 0}
+        self.authors = dict(Author.objects.values_list('full_name', 'pk'))
+        self.genres = dict(Genre.objects.values_list('name', 'pk'))
+        self.publishers = dict(Publisher.objects.values_list('name', 'pk'))
+
+    # Контрольные точки
+
+    def _load_checkpoint(self, source):
+        if not self.checkpoint or not os.path.exists(self.checkpoint):
+            return 0
+        with open(self.checkpoint, encoding='utf-8') as f:
+            state = json.load(f)
+        if state.get('source') != os.path.abspath(source):
+            raise CatalogImportError('Контрольная точка относится к другому файлу')
+        self.stats.update(state.get('stats', {}))
+        return state['records']
+
+    def _save_checkpoint(self, source, records):
+        if not self.checkpoint:
+            return
+        state = {'source': os.path.abspath(source), 'records': records, 'stats': self.stats}
+        tmp_path = f'{self.checkpoint}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.checkpoint)
+
+    # Разбор записей
+
+    def _clean(self, record):
+        isbn = str(record.get('isbn') or '').strip()
+        title = str(record.get('title') or '').strip()
+        try:
+            year = int(record.get('publication_year'))
+        except (TypeError, ValueError):
+            year = None
+        if not isbn or len(isbn) > 13 or not title or year is None:
+            return None
+        authors = [_parse_author(author) for author in _as_list(record.get('authors'))]
+        return {
+            'isbn': isbn,
+            'title': title[:200],
+            'description': record.get('description') or '',
+            'publication_year': year,
+            'publisher': str(record.get('publisher') or '').strip()[:200],
+            'publisher_country': str(record.get('publisher_country') or '').strip()[:100],
+            'authors': [(name[:200], birth_date) for name, birth_date in authors if name],
+            'genres': [str(name).strip()[:100] for name in _as_list(record.get('genres')) if str(name).strip()],
+        }
+
+    # Справочники
+
+    def _resolve_publishers(self, records):
+        new = {}
+        for record in records:
+            name = record['publisher']
+            if name and name not in self.publishers and name not in new:
+                # Год основания неизвестен; берем год первой книги как верхнюю оценку
+                new[name] = Publisher(
+                    name=name,
+                    country=record['publisher_country'],
+                    foundation_year=record['publication_year'],
+                    search_name=normalize_search_text(name),
+                )
+        for publisher in Publisher.objects.bulk_create(new.values()):
+            self.publishers[publisher.name] = publisher.pk
+
+    def _resolve_authors(self, records):
+        new = {}
+        for record in records:
+            for name, birth_date in record['authors']:
+                if name not in self.authors and name not in new:
+                    new[name] = Author(
+                        full_name=name,
+                        birth_date=birth_date or self.default_birth_date,
+                        search_name=normalize_search_text(name),
+                    )
+        for author in Author.objects.bulk_create(new.values()):
+            self.authors[author.full_name] = author.pk
+
+    def _resolve_genres(self, records):
+        new = {}
+        for record in records:
+            for name in record['genres']:
+                if name not in self.genres and name not in new:
+                    new[name] = Genre(name=name, search_name=normalize_search_text(name))
+        for genre in Genre.objects.bulk_create(new.values()):
+            self.genres[genre.name] = genre.pk
+
+    # Импорт
+
+    def _import_batch(self, raw_records):
+        records = {}
+        for raw in raw_records:
+            record = self._clean(raw)
+            if record is None:
+                self.stats['errors'] += 1
+            elif record['isbn'] in records:
+                self.stats['skipped'] += 1
+            else:
+                records[record['isbn']] = record
+        existing = set(Book.objects.filter(isbn__in=records).values_list('isbn', flat=True))
+        self.stats['skipped'] += len(existing)
+        records = [record for isbn, record in records.items() if isbn not in existing]
+        if not records:
+            return
+
+        with transaction.atomic():
+            self._resolve_publishers(records)
+            self._resolve_authors(records)
+            self._resolve_genres(records)
+
+            books = Book.objects.bulk_create([
+                Book(
+                    isbn=record['isbn'],
+                    title=record['title'],
+                    description=record['description'],
+                    publication_year=record['publication_year'],
+                    publisher_id=self.publishers.get(record['publisher']),
+                )
+                for record in records
+            ])
+
+            book_authors, book_genres, documents = [], [], []
+            for book, record in zip(books, records):
+                author_names = list(dict.fromkeys(name for name, _ in record['authors']))
+                genre_names = list(dict.fromkeys(record['genres']))
+                book_authors.extend(
+                    Book.authors.through(book_id=book.pk, author_id=self.authors[name])
+                    for name in author_names
+                )
+                book_genres.extend(
+                    Book.genres.through(book_id=book.pk, genre_id=self.genres[name])
+                    for name in genre_names
+                )
+                documents.append((
+                    book.pk, book.title, book.description,
+                    ', '.join(author_names), ', '.join(genre_names), record['publisher'],
+                ))
+            Book.authors.through.objects.bulk_create(book_authors)
+            Book.genres.through.objects.bulk_create(book_genres)
+            # bulk_create не вызывает сигналы, поэтому индексируем и считаем книги вручную
+            search.add_documents(documents)
+            adjust_book_counts(Publisher, [book.publisher_id for book in books])
+            adjust_book_counts(Author, [link.author_id for link in book_authors])
+            adjust_book_counts(Genre, [link.genre_id for link in book_genres])
+
+        self.stats['created'] += len(books)
+
+    def run(self, path, fmt=None):
+        """Импортирует файл, продолжая с контрольной точки, если она есть"""
+        return self.import_records(iter_records(path, fmt), source=path)
+
+    def import_records(self, records, source=None):
+        """Импортирует произвольный поток записей (используется и генератором данных)"""
+        start = self._load_checkpoint(source) if source else 0
+        started_at = time.monotonic()
+        batch = []
+        position = 0
+        for position, record in enumerate(records, start=1):
+            if position <= start:
+                continue
+            batch.append(record)
+            if len(batch) >= self.batch_size:
+                self._flush(source, batch, position, start, started_at)
+                batch = []
+        if batch:
+            self._flush(source, batch, position, start, started_at)
+        return self.stats
+
+    def _flush(self, source, batch, position, start, started_at):
+        self._import_batch(batch)
+        self.stats['processed'] = position
+        if source:
+            self._save_checkpoint(source, position)
+        if self.progress:
+            elapsed = max(time.monotonic() - started_at, 1e-6)
+            rate = (position - start) / elapsed
+            self.progress(self.stats, rate)
@@ -0,0 +1,108 @@
+import re
+import threading
+import time
+from collections import Counter
+
+# Литералы и списки параметров заменяются, чтобы запросы, отличающиеся только
+# значениями (типичный N+1: один и тот же SELECT для каждой строки), совпадали
+LITERAL_RE = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b|%s")
+IN_LIST_RE = re.compile(r'\bIN \((?:\?, )*\?\)')
+SPACE_RE = re.compile(r'\s+')
+
+# Сколько шаблонов запросов хранить в отчете на один маршрут
+MAX_FINGERPRINTS = 20
+
+
+def fingerprint(sql):
+    """Нормализованный шаблон SQL без значений параметров"""
+    sql = LITERAL_RE.sub('?', sql)
+    sql = IN_LIST_RE.sub('IN (...)', sql)
+    return SPACE_RE.sub(' ', sql).strip()
+
+
+class QueryStats:
+    """Обертка execute_wrapper, считающая запросы одного HTTP-запроса"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+            self.statements[sql, repr(params)] += 1
+            self.fingerprints[sql] += 1
+
+    @property
+    def duplicates(self):
+        """Число повторов полностью идентичных запросов (тот же SQL и параметры)"""
+        return sum(count - 1 for count in self.statements.values() if count > 1)
+
+    def suspected_n_plus_one(self, threshold):
+        """Шаблоны запросов, выполненные не меньше threshold раз"""
+        repeated = Counter()
+        for sql, count in self.fingerprints.items():
+            if count >= threshold:
+                repeated[fingerprint(sql)] += count
+        return repeated
+
+
+class QueryReport:
+    """Агрегированная по именам маршрутов статистика запросов процесса"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = {}
+
+    def record(self, route, stats, suspects):
+        with self._lock:
+            entry = self._routes.setdefault(route, {
+                'requests': 0,
+                'queries': 0,
+                'max_queries': 0,
+                'duration': 0.0,
+                'duplicates': 0,
+                'flagged_requests': 0,
+                'suspects': Counter(),
+            })
+            entry['requests'] += 1
+            entry['queries'] += stats.count
+            entry['max_queries'] = max(entry['max_queries'], stats.count)
+            entry['duration'] += stats.duration
+            entry['duplicates'] += stats.duplicates
+            if suspects:
+                entry['flagged_requests'] += 1
+                entry['suspects'].update(suspects)
+                if len(entry['suspects']) > MAX_FINGERPRINTS:
+                    entry['suspects'] = Counter(dict(entry['suspects'].most_common(MAX_FINGERPRINTS)))
+
+    def rows(self):
+        with self._lock:
+            routes = {route: dict(entry, suspects=entry['suspects'].copy()) for route, entry in self._routes.items()}
+        rows = []
+        for route, entry in routes.items():
+            requests = entry['requests']
+            rows.append({
+                'route': route,
+                'requests': requests,
+                'avg_queries': entry['queries'] / requests,
+                'max_queries': entry['max_queries'],
+                'avg_time_ms': entry['duration'] / requests * 1000,
+                'duplicates': entry['duplicates'],
+                'flagged_requests': entry['flagged_requests'],
+                'suspects': entry['suspects'].most_common(5),
+            })
+        return sorted(rows, key=lambda row: (-row['flagged_requests'], -row['avg_queries']))
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+
+
+report = QueryReport()
@@ -0,0 +1,160 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from urllib.parse import urlencode, urlsplit
+
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from library.benchmarks import summarize, write_results
+from library.models import Book, Reader
+
+# Маршрут -> (sync-представление для WSGI, async-представление для ASGI)
+ROUTES = {
+    'book_list': ('library:book_list', 'library:async_book_list'),
+    'book_detail': ('library:book_detail', 'library:async_book_detail'),
+    'reader_lookup': ('library:reader_lookup', 'library:async_reader_lookup'),
+}
+
+
+def wsgi_request(application, url, host, slow_client):
+    """Один запрос через WSGIHandler; медленный клиент держит поток, пока читает ответ"""
+    parts = urlsplit(url)
+    environ = {
+        'REQUEST_METHOD': 'GET', 'PATH_INFO': parts.path, 'QUERY_STRING': parts.query,
+        'SERVER_NAME': host, 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1',
+        'HTTP_HOST': host, 'wsgi.input': BytesIO(), 'wsgi.url_scheme': 'http',
+        'wsgi.errors': BytesIO(), 'wsgi.multithread': True, 'wsgi.multiprocess': False,
+    }
+    status = []
+    body = application(environ, lambda code, headers, exc_info=None: status.append(code))
+    try:
+        for _ in body:
+            time.sleep(slow_client)
+    finally:
+        if hasattr(body, 'close'):
+            body.close()
+    return int(status[0].split()[0])
+
+
+async def asgi_request(application, url, host, slow_client):
+    """Один запрос через ASGIHandler; медленный клиент ждет в цикле событий, а не в потоке"""
+    parts = urlsplit(url)
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+        'scheme': 'http', 'path': parts.path, 'raw_path': parts.path.encode(),
+        'query_string': parts.query.encode(), 'root_path': '',
+        'headers': [(b'host', host.encode())], 'server': (host, 80), 'client': ('127.0.0.1', 0),
+    }
+    received = False
+    status = []
+
+    async def receive():
+        nonlocal received
+        if not received:
+            received = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        # Клиент не отключается: Django отменит ожидание после ответа
+        await asyncio.Future()
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            status.append(message['status'])
+        elif message['type'] == 'http.response.body':
+            await asyncio.sleep(slow_client)
+
+    await application(scope, receive, send)
+    return status[0]
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает sync-представления через WSGI с пулом потоков и async-представления через ASGI'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--route', choices=sorted(ROUTES), action='append', dest='routes')
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--concurrency', type=int, default=50, help='Одновременных клиентов')
+        parser.add_argument('--threads', type=int, default=4, help='Потоков WSGI-сервера')
+        parser.add_argument('--slow-client-ms', type=float, default=50.0, help='Сколько клиент читает ответ')
+        parser.add_argument('--host', default='localhost')
+        parser.add_argument('--output', help='Файл для результатов в JSON')
+
+    def handle(self, *args, **options):
+        book = Book.objects.order_by('pk').first()
+        reader = Reader.objects.order_by('pk').first()
+        if book is None or reader is None:
+            raise CommandError('Нет книг или читателей: сначала выполните generate_catalog')
+        kwargs = {'book_detail': {'pk': book.pk}}
+        query = {'reader_lookup': '?' + urlencode({'q': reader.search_name[:3]})}
+        slow_client = options['slow_client_ms'] / 1000
+
+        results = {}
+        for route in options['routes'] or list(ROUTES):
+            sync_name, async_name = ROUTES[route]
+            urls = [reverse(name, kwargs=kwargs.get(route)) + query.get(route, '') for name in (sync_name, async_name)]
+            results[route] = {
+                'wsgi': self.run_wsgi(urls[0], slow_client, options),
+                'asgi': asyncio.run(self.run_asgi(urls[1], slow_client, options)),
+            }
+            for mode, result in results[route].items():
+                self.stdout.write(
+                    f"{route:15} {mode}  {result['throughput_rps']:8.1f} req/s  "
+                    f"p50 {result['p50_ms']:8.2f} мс  p99 {result['p99_ms']:8.2f} мс  статусы {result['statuses']}"
+                )
+
+        if options['output']:
+            write_results(options['output'], 'asgi', results, **{
+                key: options[key] for key in ('requests', 'concurrency', 'threads', 'slow_client_ms')
+            })
+            self.stdout.write(self.style.SUCCESS(f"Результаты сохранены в {options['output']}"))
+
+    def shares(self, options):
+        """Сколько запросов подряд отправит каждый из concurrency клиентов"""
+        clients = max(min(options['concurrency'], options['requests']), 1)
+        return [options['requests'] // clients + (number < options['requests'] % clients) for number in range(clients)]
+
+    def summary(self, outcomes, elapsed):
+        return {
+            **summarize([latency for _, latency in outcomes]),
+            'throughput_rps': round(len(outcomes) / elapsed, 1),
+            'statuses': sorted({status for status, _ in outcomes}),
+        }
+
+    def run_wsgi(self, url, slow_client, options):
+        application = WSGIHandler()
+        # Свободные потоки WSGI-сервера: остальные клиенты ждут в очереди
+        workers = threading.BoundedSemaphore(options['threads'])
+
+        def client(count):
+            outcomes = []
+            for _ in range(count):
+                request_started = time.perf_counter()
+                with workers:
+                    status = wsgi_request(application, url, options['host'], slow_client)
+                outcomes.append((status, (time.perf_counter() - request_started) * 1000))
+            return outcomes
+
+        started = time.perf_counter()
+        shares = self.shares(options)
+        with ThreadPoolExecutor(max_workers=len(shares)) as pool:
+            outcomes = [outcome for chunk in pool.map(client, shares) for outcome in chunk]
+        return self.summary(outcomes, time.perf_counter() - started)
+
+    async def run_asgi(self, url, slow_client, options):
+        application = ASGIHandler()
+
+        async def client(count):
+            outcomes = []
+            for _ in range(count):
+                request_started = time.perf_counter()
+                status = await asgi_request(application, url, options['host'], slow_client)
+                outcomes.append((status, (time.perf_counter() - request_started) * 1000))
+            return outcomes
+
+        started = time.perf_counter()
+        chunks = await asyncio.gather(*(client(count) for count in self.shares(options)))
+        return self.summary([outcome for chunk in chunks for outcome in chunk], time.perf_counter() - started)
@@ -0,0 +1,109 @@
+import threading
+import time
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.utils import timezone
+
+from library.benchmarks import summarize, write_results
+from library.models import Book, BookReservation, Reader
+from library.services import ReservationConflict, recount_active_reservations, reserve_book
+
+
+def legacy_reserve(book_id, reader):
+    """Прежний путь: проверить наличие активной брони, затем вставить"""
+    if BookReservation.objects.filter(book_id=book_id, status='active').exists():
+        raise ReservationConflict('Эта книга уже забронирована')
+    if reader.reservations.filter(book_id=book_id, status='active').exists():
+        raise ReservationConflict('У этого читателя уже есть активная бронь на эту книгу')
+    return BookReservation.objects.create(
+        book_id=book_id, reader=reader, status='active',
+        end_date=timezone.now() + timezone.timedelta(days=14),
+    )
+
+
+MODES = {
+    'engine': reserve_book,
+    'legacy': legacy_reserve,
+}
+
+
+class Command(BaseCommand):
+    help = 'Бронирует одну популярную книгу из нескольких потоков одновременно и считает исходы'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--book', type=int, help='ID книги (по умолчанию — первая свободная)')
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--rounds', type=int, default=20)
+        parser.add_argument('--mode', choices=sorted(MODES), default='engine')
+        parser.add_argument('--output', help='Файл для результатов в JSON')
+
+    def handle(self, *args, **options):
+        books = Book.objects.filter(pk=options['book']) if options['book'] else Book.objects.filter(active_reservations=0)
+        book = books.order_by('pk').first()
+        if book is None:
+            raise CommandError('Нет книги для теста')
+        readers = list(Reader.objects.order_by('pk')[:options['threads']])
+        if len(readers) < options['threads']:
+            raise CommandError(f"Нужно не меньше {options['threads']} читателей")
+        if not book.is_available():
+            raise CommandError('Книга уже забронирована')
+
+        reserve = MODES[options['mode']]
+        outcomes = Counter()
+        latencies = []
+        double_bookings = 0
+        lock = threading.Lock()
+        started = time.perf_counter()
+
+        for _ in range(options['rounds']):
+            barrier = threading.Barrier(len(readers))
+
+            def attempt(reader):
+                try:
+                    barrier.wait()
+                    request_started = time.perf_counter()
+                    try:
+                        reserve(book.pk, reader)
+                        outcome = 'reserved'
+                    except ReservationConflict:
+                        outcome = 'conflict'
+                    except Exception as e:
+                        outcome = type(e).__name__
+                    elapsed = (time.perf_counter() - request_started) * 1000
+                    with lock:
+                        outcomes[outcome] += 1
+                        latencies.append(elapsed)
+                finally:
+                    connections.close_all()
+
+            threads = [threading.Thread(target=attempt, args=(reader,)) for reader in readers]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            # Больше одной активной брони за раунд — двойное бронирование
+            active = BookReservation.objects.filter(book=book, status='active')
+            double_bookings += max(active.count() - 1, 0)
+            active.update(status='completed')
+            recount_active_reservations([book.pk])
+
+        elapsed = time.perf_counter() - started
+        result = {
+            'mode': options['mode'],
+            'threads': len(readers),
+            'rounds': options['rounds'],
+            'outcomes': dict(outcomes),
+            'double_bookings': double_bookings,
+            'throughput_rps': round(sum(outcomes.values()) / elapsed, 2),
+            **summarize(latencies),
+        }
+        for outcome, count in sorted(outcomes.items()):
+            self.stdout.write(f'{outcome:20} {count}')
+        self.stdout.write(f'Двойных бронирований: {double_bookings}')
+        self.stdout.write(f"p50 {result['p50_ms']:.2f} мс  p95 {result['p95_ms']:.2f} мс  p99 {result['p99_ms']:.2f} мс")
+        if options['output']:
+            write_results(options['output'], 'contention', {options['mode']: result}, book=book.pk)
+            self.stdout.write(self.style.SUCCESS(f"Результаты сохранены в {options['output']}"))
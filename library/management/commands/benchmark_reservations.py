@@ -0,0 +1,106 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Case, Count, IntegerField, Value, When
+from django.utils import timezone
+
+from library.benchmarks import summarize, write_results
+from library.models import BookReservation, Reader
+
+COMPOSITE_INDEXES = [
+    ('reader', 'status', 'end_date'),
+    ('book', 'status'),
+]
+
+
+def legacy_queryset(reader, now):
+    """Прежний запрос страницы броней: приоритет через Case/When по всей истории"""
+    return BookReservation.objects.filter(reader=reader).annotate(
+        status_priority=Case(
+            When(status='active', end_date__lt=now, then=Value(1)),
+            When(status='active', end_date__gte=now, then=Value(2)),
+            When(status='completed', then=Value(3)),
+            When(status='canceled', then=Value(4)),
+            output_field=IntegerField(),
+        )
+    ).order_by('status_priority', '-reservation_date')
+
+
+def current_querysets(reader):
+    """Запросы текущей версии reader_reservations"""
+    reservations = BookReservation.objects.filter(reader=reader)
+    history = reservations.filter(status__in=BookReservation.CLOSED_STATUSES).order_by('-end_date', '-pk')
+    return {
+        'active': reservations.filter(status='active').order_by('end_date'),
+        'history_page': history[:25],
+        'history_count': history,
+    }
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает планы и время запросов страницы броней читателя с составными индексами и без них'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reader', type=int, help='ID читателя (по умолчанию — с самой длинной историей)')
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--output', help='Файл для результатов в JSON')
+
+    def handle(self, *args, **options):
+        reader = self.get_reader(options['reader'])
+        self.stdout.write(f'Читатель #{reader.pk}, броней: {reader.reservations.count()}')
+
+        results = {}
+        with transaction.atomic():
+            # DDL в SQLite и PostgreSQL транзакционен: индексы вернутся при откате
+            self.drop_composite_indexes()
+            results['without_indexes'] = self.measure(reader, options['iterations'])
+            transaction.set_rollback(True)
+        results['with_indexes'] = self.measure(reader, options['iterations'])
+
+        for phase, queries in results.items():
+            self.stdout.write(self.style.MIGRATE_HEADING(f'\n{phase}'))
+            for name, result in queries.items():
+                self.stdout.write(f"{name:15} p50 {result['p50_ms']:8.3f} мс  p95 {result['p95_ms']:8.3f} мс")
+                for line in result['plan'].splitlines():
+                    self.stdout.write(f'    {line}')
+
+        if options['output']:
+            write_results(options['output'], 'reader_reservations', results,
+                          reader=reader.pk, iterations=options['iterations'])
+            self.stdout.write(self.style.SUCCESS(f"Результаты сохранены в {options['output']}"))
+
+    def get_reader(self, reader_id):
+        readers = Reader.objects.all()
+        if reader_id:
+            readers = readers.filter(pk=reader_id)
+        else:
+            readers = readers.annotate(total=Count('reservations')).order_by('-total')
+        reader = readers.first()
+        if reader is None:
+            raise CommandError('Читатель не найден')
+        return reader
+
+    def drop_composite_indexes(self):
+        # schema_editor в SQLite нельзя открыть внутри atomic, поэтому DROP INDEX напрямую
+        with connection.cursor() as cursor:
+            for index in BookReservation._meta.indexes:
+                if tuple(index.fields) in COMPOSITE_INDEXES:
+                    cursor.execute(f'DROP INDEX {connection.ops.quote_name(index.name)}')
+
+    def measure(self, reader, iterations):
+        querysets = {'legacy': legacy_queryset(reader, timezone.now()), **current_querysets(reader)}
+        results = {}
+        for name, queryset in querysets.items():
+            if name == 'history_count':
+                queryset = queryset.order_by()
+                run = queryset.count
+            else:
+                run = lambda queryset=queryset: list(queryset.all())
+            latencies = []
+            for _ in range(iterations):
+                started = time.perf_counter()
+                run()
+                latencies.append((time.perf_counter() - started) * 1000)
+            results[name] = {**summarize(latencies), 'plan': queryset.explain()}
+        return results
@@ -0,0 +1,154 @@
+import os
+import random
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, OperationalError, connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from library.benchmarks import summarize, write_results
+from library.db import PRODUCTION_PRAGMAS, copy_sqlite
+from library.models import Book, BookReservation, Reader
+
+# Временный псевдоним для копии базы; основная база не изменяется
+ALIAS = 'sqlite_benchmark'
+
+# Профиль -> настройки соединения; persistent=False закрывает соединение
+# после каждой операции, как CONN_MAX_AGE=0 в конце каждого HTTP-запроса
+PROFILES = {
+    'baseline': {
+        'PRAGMAS': {'journal_mode': 'DELETE', 'synchronous': 'FULL'},
+        'OPTIONS': {'timeout': 5},
+        'persistent': False,
+    },
+    'production': {
+        'PRAGMAS': PRODUCTION_PRAGMAS,
+        'OPTIONS': {'timeout': 20, 'transaction_mode': 'IMMEDIATE'},
+        'persistent': True,
+    },
+}
+
+
+def read_catalog(rnd, book_ids):
+    """Страница каталога: список книг с издательством и число свободных"""
+    offset = rnd.randrange(max(len(book_ids) - 20, 1))
+    list(Book.objects.using(ALIAS).select_related('publisher').order_by('title')[offset:offset + 20])
+    Book.objects.using(ALIAS).filter(active_reservations=0).count()
+
+
+def write_reservation(rnd, book_ids, reader_ids):
+    """Бронирование или возврат случайной книги в одной транзакции"""
+    book_id = rnd.choice(book_ids)
+    with transaction.atomic(using=ALIAS):
+        books = Book.objects.using(ALIAS).filter(pk=book_id)
+        if books.filter(active_reservations=0).update(active_reservations=F('active_reservations') + 1):
+            BookReservation.objects.using(ALIAS).bulk_create([BookReservation(
+                book_id=book_id, reader_id=rnd.choice(reader_ids), status='active',
+                end_date=timezone.now() + timedelta(days=14),
+            )])
+        else:
+            BookReservation.objects.using(ALIAS).filter(book_id=book_id, status='active').update(status='completed')
+            books.update(active_reservations=0)
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает смешанную нагрузку чтения и бронирований на SQLite в обычном и продакшен-профиле'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=8, help='Потоков чтения каталога')
+        parser.add_argument('--writers', type=int, default=2, help='Потоков бронирования')
+        parser.add_argument('--duration', type=float, default=5.0, help='Секунд на профиль')
+        parser.add_argument('--profile', choices=sorted(PROFILES), action='append', dest='profiles')
+        parser.add_argument('--output', help='Файл для результатов в JSON')
+
+    def handle(self, *args, **options):
+        source = connections[DEFAULT_DB_ALIAS]
+        if source.vendor != 'sqlite':
+            raise CommandError('Бенчмарк рассчитан на SQLite')
+        book_ids = list(Book.objects.order_by('pk').values_list('pk', flat=True)[:500])
+        reader_ids = list(Reader.objects.order_by('pk').values_list('pk', flat=True)[:100])
+        if not book_ids or not reader_ids:
+            raise CommandError('Нет книг или читателей: сначала выполните generate_catalog')
+
+        results = {}
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for name in options['profiles'] or list(PROFILES):
+                # Каждый профиль начинает с одинаковой копии базы
+                path = os.path.join(tmpdir, f'{name}.sqlite3')
+                copy_sqlite(source, path)
+                results[name] = self.run_profile(PROFILES[name], path, book_ids, reader_ids, options)
+
+        for name, result in results.items():
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            for kind in ('read', 'write'):
+                stats = result[kind]
+                line = f"  {kind:6} {stats['ops_per_sec']:9.1f} оп/с"
+                if stats['count']:
+                    line += f"  p50 {stats['p50_ms']:.2f} мс  p95 {stats['p95_ms']:.2f} мс  p99 {stats['p99_ms']:.2f} мс"
+                self.stdout.write(line)
+            self.stdout.write(f"  ошибки: {result['errors'] or 'нет'}")
+
+        if options['output']:
+            write_results(options['output'], 'sqlite_profiles', results,
+                          readers=options['readers'], writers=options['writers'], duration=options['duration'])
+            self.stdout.write(self.style.SUCCESS(f"Результаты сохранены в {options['output']}"))
+
+    def run_profile(self, profile, path, book_ids, reader_ids, options):
+        connections.settings[ALIAS] = {
+            **connections.settings[DEFAULT_DB_ALIAS],
+            'NAME': path,
+            'PRAGMAS': profile['PRAGMAS'],
+            'OPTIONS': profile['OPTIONS'],
+            'CONN_MAX_AGE': None if profile['persistent'] else 0,
+        }
+        latencies = {'read': [], 'write': []}
+        errors = Counter()
+        lock = threading.Lock()
+        deadline = time.perf_counter() + options['duration']
+
+        def worker(kind, seed):
+            rnd = random.Random(seed)
+            try:
+                while time.perf_counter() < deadline:
+                    started = time.perf_counter()
+                    try:
+                        if kind == 'read':
+                            read_catalog(rnd, book_ids)
+                        else:
+                            write_reservation(rnd, book_ids, reader_ids)
+                    except (OperationalError, IntegrityError) as e:
+                        with lock:
+                            errors[f'{kind}: {e}'] += 1
+                        continue
+                    finally:
+                        if not profile['persistent']:
+                            connections[ALIAS].close()
+                    elapsed = (time.perf_counter() - started) * 1000
+                    with lock:
+                        latencies[kind].append(elapsed)
+            finally:
+                connections[ALIAS].close()
+
+        threads = [
+            threading.Thread(target=worker, args=(kind, seed))
+            for seed, kind in enumerate(['read'] * options['readers'] + ['write'] * options['writers'])
+        ]
+        started = time.perf_counter()
+        try:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            del connections.settings[ALIAS]
+        elapsed = time.perf_counter() - started
+
+        result = {'errors': dict(errors)}
+        for kind, values in latencies.items():
+            result[kind] = {**summarize(values), 'ops_per_sec': round(len(values) / elapsed, 1)}
+        return result
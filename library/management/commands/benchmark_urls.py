@@ -0,0 +1,119 @@
+import time
+from contextlib import ExitStack
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from library import urls as library_urls
+from library.benchmarks import load_results, summarize, write_results
+from library.models import Author, Book, Genre, Publisher, Reader, User
+
+# Модель, из которой берется значение параметра маршрута
+KWARG_MODELS = {
+    'book_id': Book,
+    'author_id': Author,
+    'reader_id': Reader,
+}
+DETAIL_MODELS = {
+    'book_detail': Book,
+    'async_book_detail': Book,
+    'author_detail': Author,
+    'publisher_detail': Publisher,
+    'genre_detail': Genre,
+}
+# Выход сбросил бы сессию для остальных маршрутов
+SKIPPED_ROUTES = {'logout'}
+
+
+class Command(BaseCommand):
+    help = 'Прогоняет GET-запросы по всем маршрутам library/urls.py и сохраняет задержки и число запросов к БД'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument('--route', action='append', dest='routes', help='Только указанные маршруты')
+        parser.add_argument('--username', help='Выполнять запросы от имени пользователя')
+        parser.add_argument('--host', default='localhost')
+        parser.add_argument('--output', help='Файл для результатов в JSON')
+        parser.add_argument('--compare', help='JSON предыдущего прогона для сравнения p50')
+
+    def handle(self, *args, **options):
+        # Ошибки шаблонов и представлений попадают в отчет как статус 500, а не прерывают прогон
+        client = Client(SERVER_NAME=options['host'], raise_request_exception=False)
+        if options['username']:
+            try:
+                client.force_login(User.objects.get(username=options['username']))
+            except User.DoesNotExist:
+                raise CommandError(f"Пользователь {options['username']} не найден")
+
+        results = {}
+        for name, url in self.collect_routes(options['routes']):
+            results[name] = self.run_route(client, url, options['iterations'], options['warmup'])
+            result = results[name]
+            self.stdout.write(
+                f"{name:28} {result['status']:>3}  p50 {result['p50_ms']:8.2f} мс  "
+                f"p95 {result['p95_ms']:8.2f} мс  запросов {result['queries']:>4}  "
+                f"{result['throughput_rps']:8.1f} req/s"
+            )
+
+        if options['compare']:
+            self.compare(load_results(options['compare']), results)
+        if options['output']:
+            write_results(options['output'], 'urls', results, iterations=options['iterations'])
+            self.stdout.write(self.style.SUCCESS(f"Результаты сохранены в {options['output']}"))
+
+    def collect_routes(self, only=None):
+        for pattern in library_urls.urlpatterns:
+            name = pattern.name
+            if name in SKIPPED_ROUTES or (only and name not in only):
+                continue
+            kwargs = {}
+            for kwarg in pattern.pattern.converters:
+                model = DETAIL_MODELS.get(name) if kwarg == 'pk' else KWARG_MODELS.get(kwarg)
+                pk = model.objects.order_by('pk').values_list('pk', flat=True).first() if model else None
+                if pk is None:
+                    break
+                kwargs[kwarg] = pk
+            else:
+                yield name, reverse(f'library:{name}', kwargs=kwargs)
+                continue
+            self.stdout.write(self.style.WARNING(f'{name}: нет данных для параметров маршрута, пропущен'))
+
+    def run_route(self, client, url, iterations, warmup):
+        for _ in range(warmup):
+            client.get(url)
+        latencies, queries = [], []
+        status = None
+        started = time.perf_counter()
+        for _ in range(iterations):
+            # Роутер реплик отправляет чтения на другие псевдонимы: считаем запросы во всех
+            with ExitStack() as stack:
+                captured = [stack.enter_context(CaptureQueriesContext(connections[alias])) for alias in connections]
+                request_started = time.perf_counter()
+                response = client.get(url)
+                latencies.append((time.perf_counter() - request_started) * 1000)
+            queries.append(sum(len(context) for context in captured))
+            status = response.status_code
+        elapsed = time.perf_counter() - started
+        return {
+            'url': url,
+            'status': status,
+            'queries': max(queries) if queries else 0,
+            'throughput_rps': round(iterations / elapsed, 2) if elapsed else None,
+            **summarize(latencies),
+        }
+
+    def compare(self, previous, current):
+        self.stdout.write('\nСравнение p50 с предыдущим прогоном:')
+        for name, result in current.items():
+            before = previous.get(name)
+            if not before or not before.get('p50_ms'):
+                continue
+            change = (result['p50_ms'] - before['p50_ms']) / before['p50_ms'] * 100
+            self.stdout.write(
+                f"{name:28} {before['p50_ms']:8.2f} -> {result['p50_ms']:8.2f} мс ({change:+.1f}%), "
+                f"запросов {before['queries']} -> {result['queries']}"
+            )
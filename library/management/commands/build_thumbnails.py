@@ -0,0 +1,48 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.db.models import F, Q
+
+from library.models import Book
+from library.thumbnails import build_for_book
+
+
+class Command(BaseCommand):
+    help = 'Строит миниатюры обложек для книг, у которых их нет или они устарели'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Перестроить и актуальные миниатюры')
+        parser.add_argument('--workers', type=int, default=4)
+
+    def build(self, book_id, force, close=True):
+        try:
+            return bool(build_for_book(book_id, force=force)), None
+        except Exception as e:
+            return False, e
+        finally:
+            if close:
+                close_old_connections()
+
+    def handle(self, *args, **options):
+        books = Book.objects.exclude(cover='').exclude(cover__isnull=True)
+        if not options['force']:
+            # Ключа source может не быть: сравнение с NULL в exclude() отбросило бы такие книги
+            books = books.filter(Q(cover_thumbnails__source__isnull=True) | ~Q(cover_thumbnails__source=F('cover')))
+        book_ids = list(books.values_list('pk', flat=True))
+        built = failed = 0
+        if options['workers'] > 1:
+            executor = ThreadPoolExecutor(max_workers=options['workers'])
+            results = executor.map(self.build, book_ids, [options['force']] * len(book_ids))
+        else:
+            # Один поток — строим в текущем соединении с БД, без пула
+            executor = None
+            results = (self.build(book_id, options['force'], close=False) for book_id in book_ids)
+        for book_id, (ok, error) in zip(book_ids, results):
+            if error:
+                failed += 1
+                self.stderr.write(f'Книга #{book_id}: {error}')
+            built += ok
+        if executor:
+            executor.shutdown()
+        self.stdout.write(self.style.SUCCESS(f'Миниатюр построено: {built}, ошибок: {failed}'))
@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from library.services import expire_reservations
+
+
+class Command(BaseCommand):
+    help = 'Переводит просроченные активные брони в статус «Просрочена»'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Строк в одном UPDATE')
+        parser.add_argument('--loop', action='store_true', help='Работать постоянно как периодический воркер')
+        parser.add_argument('--interval', type=int, default=300, help='Пауза между проходами в секундах')
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.monotonic()
+            expired = expire_reservations(chunk_size=options['chunk_size'])
+            elapsed = time.monotonic() - started
+            self.stdout.write(self.style.SUCCESS(f'Просрочено броней: {expired} ({elapsed:.2f} с)'))
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
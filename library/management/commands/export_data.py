@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from library.exports import DATASETS, FORMATS, iter_export
+
+
+class Command(BaseCommand):
+    help = 'Потоково выгружает брони, книги или читателей в CSV/JSONL'
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=sorted(DATASETS))
+        parser.add_argument('--format', choices=sorted(FORMATS), default='csv')
+        parser.add_argument('--status', default='', help='Фильтр броней по статусу')
+        parser.add_argument('--output', help='Файл выгрузки (по умолчанию stdout)')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        lines = iter_export(
+            options['dataset'], options['format'],
+            params={'status': options['status']}, chunk_size=options['chunk_size'],
+        )
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8', newline='') as f:
+                f.writelines(lines)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending='')
@@ -0,0 +1,165 @@
+import random
+from datetime import date, timedelta
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from library.importers import CatalogImporter
+from library.models import (
+    Book, BookReservation, Reader, ReaderSearchToken, User, normalize_search_text, only_digits, search_tokens,
+)
+from library.services import recount_active_reservations
+
+FIRST_NAMES = ['Александр', 'Лев', 'Федор', 'Анна', 'Марина', 'Иван', 'Ольга', 'Михаил', 'Татьяна', 'Николай']
+LAST_NAMES = ['Пушкин', 'Толстой', 'Достоевский', 'Ахматова', 'Цветаева', 'Бунин', 'Берггольц',
+              'Булгаков', 'Толстая', 'Гоголь', 'Чехов', 'Тургенев', 'Лермонтов', 'Некрасов']
+WORDS = ['война', 'мир', 'ночь', 'сад', 'дорога', 'море', 'город', 'память', 'звезда', 'река',
+         'история', 'время', 'дом', 'зима', 'письма', 'тайна', 'свет', 'поле', 'песня', 'сон']
+GENRES = ['Роман', 'Поэзия', 'Драма', 'Повесть', 'Рассказ', 'Фантастика', 'Детектив', 'Биография',
+          'История', 'Философия', 'Сказка', 'Публицистика']
+COUNTRIES = ['Россия', 'Беларусь', 'Казахстан', 'Германия', 'Франция']
+
+# Доли книг с 1, 2 и 3 авторами/жанрами
+AUTHORS_PER_BOOK = ([1, 2, 3], [70, 25, 5])
+GENRES_PER_BOOK = ([1, 2, 3], [55, 35, 10])
+
+
+class Command(BaseCommand):
+    help = 'Генерирует синтетический каталог, читателей и брони для нагрузочного тестирования'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--books', type=int, default=10000)
+        parser.add_argument('--authors', type=int, default=2000)
+        parser.add_argument('--genres', type=int, default=len(GENRES))
+        parser.add_argument('--publishers', type=int, default=100)
+        parser.add_argument('--readers', type=int, default=1000)
+        parser.add_argument('--reservations', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.generate_books(options)
+        readers = self.generate_readers(options['readers'], options['batch_size'])
+        self.generate_reservations(options['reservations'], readers, options['batch_size'])
+        self.stdout.write(self.style.SUCCESS('Синтетические данные созданы'))
+
+    # Каталог
+
+    def _pick(self, population, cum_weights, count):
+        picked = {}
+        while len(picked) < min(count, len(population)):
+            item = self.random.choices(population, cum_weights=cum_weights)[0]
+            picked[id(item)] = item
+        return list(picked.values())
+
+    def book_records(self, options):
+        rnd = self.random
+        authors = [
+            {
+                'full_name': f'{rnd.choice(FIRST_NAMES)} {rnd.choice(LAST_NAMES)} {number}',
+                'birth_date': (date(1750, 1, 1) + timedelta(days=rnd.randrange(90000))).isoformat(),
+            }
+            for number in range(options['authors'])
+        ]
+        # Популярность авторов и жанров распределена по степенному закону
+        author_weights = list(accumulate(1 / (rank + 1) for rank in range(len(authors))))
+        genres = [
+            GENRES[number] if number < len(GENRES) else f'{GENRES[number % len(GENRES)]} {number}'
+            for number in range(options['genres'])
+        ]
+        genre_weights = list(accumulate(1 / (rank + 1) for rank in range(len(genres))))
+        publishers = [f'Издательство {number}' for number in range(options['publishers'])]
+
+        isbn_base = 9780000000000 + Book.objects.count()
+        for number in range(options['books']):
+            words = rnd.sample(WORDS, rnd.randint(1, 4))
+            yield {
+                'isbn': str(isbn_base + number),
+                'title': ' '.join(words).capitalize() + f' {number}',
+                'description': ' '.join(rnd.choices(WORDS, k=rnd.randint(10, 60))),
+                'publication_year': rnd.randint(1800, date.today().year),
+                'publisher': rnd.choice(publishers) if publishers else '',
+                'publisher_country': rnd.choice(COUNTRIES),
+                'authors': self._pick(authors, author_weights, rnd.choices(*AUTHORS_PER_BOOK)[0]),
+                'genres': self._pick(genres, genre_weights, rnd.choices(*GENRES_PER_BOOK)[0]),
+            }
+
+    def generate_books(self, options):
+        importer = CatalogImporter(
+            batch_size=options['batch_size'],
+            progress=lambda stats, rate: self.stdout.write(
+                f"Книг создано: {stats['created']} ({rate:.0f} зап/с)"
+            ),
+        )
+        importer.import_records(self.book_records(options))
+
+    # Читатели и брони
+
+    def generate_readers(self, count, batch_size):
+        rnd = self.random
+        password = make_password('benchmark')
+        offset = User.objects.count()
+        created = []
+        for start in range(0, count, batch_size):
+            numbers = range(offset + start, offset + min(start + batch_size, count))
+            with transaction.atomic():
+                users = User.objects.bulk_create([
+                    User(username=f'reader{number}@example.com', email=f'reader{number}@example.com',
+                         password=password, role='reader')
+                    for number in numbers
+                ])
+                readers = []
+                for user, number in zip(users, numbers):
+                    full_name = f'{rnd.choice(LAST_NAMES)} {rnd.choice(FIRST_NAMES)} {number}'
+                    phone = f'+79{rnd.randrange(10 ** 9):09d}'
+                    # bulk_create не вызывает Reader.save, поэтому ключи поиска заполняем сами
+                    readers.append(Reader(
+                        user=user, full_name=full_name, email=user.email, phone=phone,
+                        birth_date=date(1950, 1, 1) + timedelta(days=rnd.randrange(20000)),
+                        address='г. Москва', role='reader',
+                        search_name=normalize_search_text(full_name),
+                        search_email=normalize_search_text(user.email),
+                        phone_digits=only_digits(phone),
+                    ))
+                readers = Reader.objects.bulk_create(readers)
+                ReaderSearchToken.objects.bulk_create(
+                    ReaderSearchToken(reader=reader, token=token)
+                    for reader in readers for token in search_tokens(reader.full_name)
+                )
+                created.extend(readers)
+        self.stdout.write(f'Читателей создано: {len(created)}')
+        return created
+
+    def generate_reservations(self, count, readers, batch_size):
+        if not readers or not count:
+            return
+        rnd = self.random
+        book_ids = list(Book.objects.values_list('pk', flat=True))
+        available = set(Book.objects.filter(active_reservations=0).values_list('pk', flat=True))
+        now = timezone.now()
+        reservations = []
+        for _ in range(count):
+            book_id = rnd.choice(book_ids)
+            reserved_at = now - timedelta(days=rnd.randrange(720))
+            # Активной может быть только одна бронь книги, остальное — история
+            if book_id in available and rnd.random() < 0.3:
+                status = 'active'
+                available.discard(book_id)
+            else:
+                status = rnd.choices(['completed', 'canceled'], [85, 15])[0]
+            reservations.append(BookReservation(
+                book_id=book_id, reader=rnd.choice(readers), status=status,
+                end_date=reserved_at + timedelta(days=14),
+            ))
+        created = BookReservation.objects.bulk_create(reservations, batch_size=batch_size)
+        # reservation_date заполняется auto_now_add, поэтому разносим историю по времени отдельно
+        BookReservation.objects.filter(pk__in=[reservation.pk for reservation in created]).update(
+            reservation_date=F('end_date') - timedelta(days=14)
+        )
+        recount_active_reservations()
+        self.stdout.write(f'Броней создано: {len(reservations)}')
@@ -0,0 +1,50 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from library.importers import CatalogImporter, CatalogImportError
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоковый импорт каталога из CSV или JSONL. Колонки: isbn, title, description, '
+        'publication_year, publisher, publisher_country, authors ("Имя|ГГГГ-ММ-ДД; Имя"), '
+        'genres ("Жанр; Жанр")'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл с каталогом')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help='По умолчанию определяется по расширению')
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument(
+            '--checkpoint',
+            help='Файл контрольной точки; если он существует, импорт продолжится с сохраненной позиции',
+        )
+        parser.add_argument(
+            '--default-birth-date',
+            type=date.fromisoformat,
+            default=date(1900, 1, 1),
+            help='Дата рождения для авторов, у которых она не указана (ГГГГ-ММ-ДД)',
+        )
+
+    def handle(self, *args, **options):
+        importer = CatalogImporter(
+            batch_size=options['batch_size'],
+            default_birth_date=options['default_birth_date'],
+            checkpoint=options['checkpoint'],
+            progress=self.report_progress,
+        )
+        try:
+            stats = importer.run(options['path'], options['format'])
+        except (OSError, ValueError, CatalogImportError) as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(
+            f"Импорт завершен: обработано {stats['processed']}, создано {stats['created']}, "
+            f"пропущено {stats['skipped']}, ошибок {stats['errors']}"
+        ))
+
+    def report_progress(self, stats, rate):
+        self.stdout.write(
+            f"Обработано {stats['processed']} записей, создано книг {stats['created']} "
+            f"({rate:.0f} зап/с)"
+        )
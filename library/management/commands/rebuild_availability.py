@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from library.services import recount_active_reservations
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает денормализованный счетчик активных броней у книг'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--book',
+            type=int,
+            action='append',
+            dest='book_ids',
+            help='ID книги для пересчета (можно указать несколько раз)',
+        )
+
+    def handle(self, *args, **options):
+        fixed = recount_active_reservations(options['book_ids'])
+        self.stdout.write(self.style.SUCCESS(f'Исправлено счетчиков: {fixed}'))
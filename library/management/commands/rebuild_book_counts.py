@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from library.services import BOOK_COUNT_LOOKUPS, recount_book_counts
+
+MODELS = {model._meta.model_name: model for model in BOOK_COUNT_LOOKUPS}
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает денормализованное число книг у авторов, жанров и издательств'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--model',
+            choices=sorted(MODELS),
+            action='append',
+            dest='models',
+            help='Модель для пересчета (по умолчанию — все; можно указать несколько раз)',
+        )
+
+    def handle(self, *args, **options):
+        for name in options['models'] or sorted(MODELS):
+            fixed = recount_book_counts(MODELS[name])
+            self.stdout.write(self.style.SUCCESS(f'{MODELS[name]._meta.verbose_name_plural}: исправлено счетчиков {fixed}'))
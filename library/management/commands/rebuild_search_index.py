@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from library.search import fts_enabled, rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает полнотекстовый индекс каталога (SQLite FTS5)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if not fts_enabled():
+            self.stdout.write(self.style.WARNING('FTS5 доступен только для SQLite, индекс не нужен'))
+            return
+        total = rebuild_index(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Проиндексировано книг: {total}'))
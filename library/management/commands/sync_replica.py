@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from library.db import copy_sqlite
+from library.routers import replica_aliases
+
+
+class Command(BaseCommand):
+    help = 'Копирует основную SQLite-базу в файлы реплик (локальная замена репликации)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('aliases', nargs='*', help='Псевдонимы реплик (по умолчанию — все из DATABASE_REPLICAS)')
+        parser.add_argument('--path', action='append', default=[], help='Скопировать в произвольный файл')
+
+    def handle(self, *args, **options):
+        targets = []
+        for alias in options['aliases'] or ([] if options['path'] else replica_aliases()):
+            if alias not in replica_aliases():
+                raise CommandError(f'{alias} не указан в DATABASE_REPLICAS')
+            # Соединение с репликой закрываем, чтобы оно увидело новую копию
+            connections[alias].close()
+            targets.append(str(connections[alias].settings_dict['NAME']))
+        targets.extend(options['path'])
+        if not targets:
+            raise CommandError('Реплики не настроены: задайте LIBRARY_DB_REPLICAS или --path')
+
+        source = connections[DEFAULT_DB_ALIAS]
+        if source.vendor != 'sqlite':
+            raise CommandError('Копирование поддерживается только для SQLite')
+        for path in targets:
+            copy_sqlite(source, path)
+            self.stdout.write(self.style.SUCCESS(f'Реплика обновлена: {path}'))
@@ -0,0 +1,151 @@
+import logging
+import random
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.utils.functional import SimpleLazyObject
+
+from .instrumentation import QueryStats, report
+from .roles import resolve_role
+from .routers import replica_aliases, replica_reads
+
+logger = logging.getLogger('library.sql')
+
+
+class AsyncCapableMiddleware:
+    """Основа middleware, работающего и под WSGI, и под ASGI без переключения в поток"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.process(request)
+
+
+class QueryInstrumentationMiddleware(AsyncCapableMiddleware):
+    """Считает SQL-запросы каждого запроса и ищет вероятные N+1.
+
+    Запросы перехватываются через connection.execute_wrapper, поэтому
+    DEBUG-логирование Django не требуется. В продакшене обрабатывается лишь
+    доля запросов (SQL_INSTRUMENTATION_SAMPLE_RATE); в DEBUG итоги также
+    отдаются заголовками X-DB-*.
+    """
+
+    def sampled(self):
+        sample_rate = getattr(settings, 'SQL_INSTRUMENTATION_SAMPLE_RATE', 1.0 if settings.DEBUG else 0.0)
+        return sample_rate > 0 and random.random() < sample_rate
+
+    def install(self, stack, stats):
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(stats))
+
+    def process(self, request):
+        if not self.sampled():
+            return self.get_response(request)
+        stats = QueryStats()
+        with ExitStack() as stack:
+            self.install(stack, stats)
+            response = self.get_response(request)
+        return self.finish(request, response, stats)
+
+    async def __acall__(self, request):
+        if not self.sampled():
+            return await self.get_response(request)
+        stats = QueryStats()
+        # Соединения привязаны к потоку: async ORM выполняет запросы в потоке
+        # sync_to_async этого запроса, туда же ставим обертки
+        stack = ExitStack()
+        await sync_to_async(self.install)(stack, stats)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        return self.finish(request, response, stats)
+
+    def finish(self, request, response, stats):
+        match = getattr(request, 'resolver_match', None)
+        route = match.view_name if match else request.path
+        threshold = getattr(settings, 'SQL_INSTRUMENTATION_N_PLUS_ONE_THRESHOLD', 5)
+        suspects = stats.suspected_n_plus_one(threshold)
+        report.record(route, stats, suspects)
+        if suspects:
+            sql, count = suspects.most_common(1)[0]
+            logger.warning('Вероятный N+1 в %s: %d раз %s', route, count, sql)
+
+        if getattr(settings, 'SQL_INSTRUMENTATION_HEADERS', settings.DEBUG):
+            response['X-DB-Query-Count'] = str(stats.count)
+            response['X-DB-Time-Ms'] = f'{stats.duration * 1000:.2f}'
+            response['X-DB-Duplicate-Queries'] = str(stats.duplicates)
+            response['X-DB-N-Plus-One'] = str(len(suspects))
+        return response
+
+
+class RoleMiddleware(AsyncCapableMiddleware):
+    """Добавляет request.library_role — роль пользователя из кэша (см. roles.py).
+
+    Роль вычисляется лениво, поэтому публичные страницы кэш не трогают.
+    Должен стоять после AuthenticationMiddleware.
+    """
+
+    def attach(self, request):
+        request.library_role = SimpleLazyObject(lambda: resolve_role(request.user))
+
+    def process(self, request):
+        self.attach(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        self.attach(request)
+        return await self.get_response(request)
+
+
+# Cookie «недавно писал»: пока она жива, чтение идет с основной базы
+REPLICA_PIN_COOKIE = 'library_primary'
+
+
+class ReplicaRoutingMiddleware(AsyncCapableMiddleware):
+    """Разрешает ReplicaRouter читать с реплик в безопасных запросах.
+
+    POST и другие изменяющие запросы целиком работают с основной базой и
+    ставят cookie на REPLICA_PIN_SECONDS: следующие страницы того же
+    пользователя тоже читают с основной базы, пока реплика догоняет запись.
+    Флаг хранится в contextvar, поэтому доходит и до потоков async ORM.
+    """
+
+    def writes(self, request):
+        return request.method not in ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+    def pinned(self, request):
+        return self.writes(request) or REPLICA_PIN_COOKIE in request.COOKIES
+
+    def finish(self, request, response):
+        if self.writes(request):
+            response.set_cookie(
+                REPLICA_PIN_COOKIE, '1',
+                max_age=getattr(settings, 'REPLICA_PIN_SECONDS', 10),
+                httponly=True, samesite='Lax',
+            )
+        return response
+
+    def process(self, request):
+        if not replica_aliases():
+            return self.get_response(request)
+        with replica_reads(not self.pinned(request)):
+            response = self.get_response(request)
+        return self.finish(request, response)
+
+    async def __acall__(self, request):
+        if not replica_aliases():
+            return await self.get_response(request)
+        with replica_reads(not self.pinned(request)):
+            response = await self.get_response(request)
+        return self.finish(request, response)
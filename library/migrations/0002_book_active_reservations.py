@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:49
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_active_reservations(apps, schema_editor):
+    Book = apps.get_model('library', 'Book')
+    BookReservation = apps.get_model('library', 'BookReservation')
+    actual = (
+        BookReservation.objects
+        .filter(book=OuterRef('pk'), status='active')
+        .order_by()
+        .values('book')
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    Book.objects.update(active_reservations=Coalesce(Subquery(actual), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='active_reservations',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Активных броней'),
+        ),
+        migrations.RunPython(fill_active_reservations, migrations.RunPython.noop),
+    ]
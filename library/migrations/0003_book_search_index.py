@@ -0,0 +1,57 @@
+from django.db import migrations
+
+FTS_TABLE = 'library_book_fts'
+
+CREATE_FTS_TABLE_SQL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    "title, description, authors, genres, publisher, "
+    "tokenize = 'unicode61 remove_diacritics 2')"
+)
+
+FILL_FTS_TABLE_SQL = f"""
+INSERT INTO {FTS_TABLE} (rowid, title, description, authors, genres, publisher)
+SELECT
+    b.id,
+    b.title,
+    b.description,
+    COALESCE((
+        SELECT group_concat(a.full_name, ', ')
+        FROM library_book_authors ba
+        JOIN library_author a ON a.id = ba.author_id
+        WHERE ba.book_id = b.id
+    ), ''),
+    COALESCE((
+        SELECT group_concat(g.name, ', ')
+        FROM library_book_genres bg
+        JOIN library_genre g ON g.id = bg.genre_id
+        WHERE bg.book_id = b.id
+    ), ''),
+    COALESCE(p.name, '')
+FROM library_book b
+LEFT JOIN library_publisher p ON p.id = b.publisher_id
+"""
+
+
+def create_search_index(apps, schema_editor):
+    # FTS5 доступен только в SQLite, на других СУБД поиск работает через icontains
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(CREATE_FTS_TABLE_SQL)
+    schema_editor.execute(FILL_FTS_TABLE_SQL)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0002_book_active_reservations'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:51
+
+from django.db import migrations, models
+
+
+def fill_search_keys(apps, schema_editor):
+    Reader = apps.get_model('library', 'Reader')
+    readers = list(Reader.objects.only('full_name', 'email', 'phone'))
+    for reader in readers:
+        reader.search_name = ' '.join(reader.full_name.lower().replace('ё', 'е').split())
+        reader.search_email = ' '.join(reader.email.lower().split())
+        reader.phone_digits = ''.join(char for char in reader.phone if char.isdigit())
+    Reader.objects.bulk_update(readers, ['search_name', 'search_email', 'phone_digits'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0003_book_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reader',
+            name='phone_digits',
+            field=models.CharField(default='', editable=False, max_length=20),
+        ),
+        migrations.AddField(
+            model_name='reader',
+            name='search_email',
+            field=models.CharField(default='', editable=False, max_length=254),
+        ),
+        migrations.AddField(
+            model_name='reader',
+            name='search_name',
+            field=models.CharField(default='', editable=False, max_length=100),
+        ),
+        migrations.AddIndex(
+            model_name='reader',
+            index=models.Index(fields=['search_name'], name='library_rea_search__240835_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reader',
+            index=models.Index(fields=['search_email'], name='library_rea_search__7ad973_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reader',
+            index=models.Index(fields=['phone_digits'], name='library_rea_phone_d_6a5b4e_idx'),
+        ),
+        migrations.RunPython(fill_search_keys, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0004_reader_search_keys'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='author',
+            index=models.Index(fields=['full_name'], name='library_aut_full_na_912894_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='genre',
+            index=models.Index(fields=['name'], name='library_gen_name_102fe5_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='publisher',
+            index=models.Index(fields=['name'], name='library_pub_name_d0230a_idx'),
+        ),
+    ]
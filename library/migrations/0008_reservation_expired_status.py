@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0007_catalog_updated_at'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='bookreservation',
+            name='status',
+            field=models.CharField(choices=[('active', 'Активная'), ('completed', 'Завершена'), ('canceled', 'Отменена'), ('expired', 'Просрочена')], default='active', max_length=10, verbose_name='Статус'),
+        ),
+    ]
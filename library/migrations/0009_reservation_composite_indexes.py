@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0008_reservation_expired_status'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bookreservation',
+            index=models.Index(fields=['reader', 'status', 'end_date'], name='library_boo_reader__fe51f8_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bookreservation',
+            index=models.Index(fields=['book', 'status'], name='library_boo_book_id_e2151d_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0009_reservation_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='cover_thumbnails',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:19
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_book_counts(apps, schema_editor):
+    Book = apps.get_model('library', 'Book')
+    for model_name, lookup in [('Author', 'authors'), ('Genre', 'genres'), ('Publisher', 'publisher')]:
+        actual = (
+            Book.objects
+            .filter(**{lookup: OuterRef('pk')})
+            .order_by()
+            .values(lookup)
+            .annotate(total=Count('pk'))
+            .values('total')
+        )
+        apps.get_model('library', model_name).objects.update(book_count=Coalesce(Subquery(actual), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0010_book_cover_thumbnails'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='author',
+            name='book_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество книг'),
+        ),
+        migrations.AddField(
+            model_name='genre',
+            name='book_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество книг'),
+        ),
+        migrations.AddField(
+            model_name='publisher',
+            name='book_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество книг'),
+        ),
+        migrations.RunPython(fill_book_counts, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='author',
+            index=models.Index(fields=['-book_count', 'full_name'], name='library_aut_book_co_051b9c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='genre',
+            index=models.Index(fields=['-book_count', 'name'], name='library_gen_book_co_e26939_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='publisher',
+            index=models.Index(fields=['-book_count', 'name'], name='library_pub_book_co_bef470_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0011_catalog_book_counts'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reader',
+            index=models.Index(fields=['registration_date'], name='library_rea_registr_dc820e_idx'),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:39
+
+from django.db import migrations, models
+
+
+def fill_search_names(apps, schema_editor):
+    for model_name, field in [('Author', 'full_name'), ('Genre', 'name'), ('Publisher', 'name')]:
+        model = apps.get_model('library', model_name)
+        rows = list(model.objects.only(field))
+        for row in rows:
+            row.search_name = ' '.join(getattr(row, field).lower().replace('ё', 'е').split())
+        model.objects.bulk_update(rows, ['search_name'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0012_reader_registration_date_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='author',
+            name='search_name',
+            field=models.CharField(default='', editable=False, max_length=200),
+        ),
+        migrations.AddField(
+            model_name='genre',
+            name='search_name',
+            field=models.CharField(default='', editable=False, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='publisher',
+            name='search_name',
+            field=models.CharField(default='', editable=False, max_length=200),
+        ),
+        migrations.RunPython(fill_search_names, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='author',
+            index=models.Index(fields=['search_name'], name='library_aut_search__987482_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='genre',
+            index=models.Index(fields=['search_name'], name='library_gen_search__e9dacf_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='publisher',
+            index=models.Index(fields=['search_name'], name='library_pub_search__929dfd_idx'),
+        ),
+    ]
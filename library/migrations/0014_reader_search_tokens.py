@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def fill_search_tokens(apps, schema_editor):
+    Reader = apps.get_model('library', 'Reader')
+    ReaderSearchToken = apps.get_model('library', 'ReaderSearchToken')
+    tokens = [
+        ReaderSearchToken(reader_id=reader_id, token=token)
+        for reader_id, search_name in Reader.objects.values_list('pk', 'search_name').iterator()
+        for token in set(search_name.split())
+    ]
+    ReaderSearchToken.objects.bulk_create(tokens, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0013_catalog_search_names'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReaderSearchToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=100)),
+                ('reader', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_tokens', to='library.reader')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['token', 'reader'], name='library_rea_token_254740_idx')],
+            },
+        ),
+        migrations.RunPython(fill_search_tokens, migrations.RunPython.noop),
+    ]
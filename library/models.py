@@ -1,9 +1,54 @@
-from django.db import models
+from django.db import models, router, transaction
 from django.core.validators import MinValueValidator, MaxValueValidator, RegexValidator
 from datetime import date, timedelta
 from django.utils import timezone
 from django.contrib.auth.models import AbstractUser
 
+
+def normalize_search_text(value):
+    """Приводит строку к виду для поиска: нижний регистр, ё -> е, одиночные пробелы"""
+    return ' '.join((value or '').lower().replace('ё', 'е').split())
+
+
+def only_digits(value):
+    """Оставляет в строке только цифры (для поиска по телефону)"""
+    return ''.join(char for char in (value or '') if char.isdigit())
+
+
+def search_tokens(value):
+    """Отдельные нормализованные слова строки (для поиска по имени или отчеству)"""
+    return sorted(set(normalize_search_text(value).split()))
+
+
+class SearchNameMixin:
+    """Заполняет поле модели search_name из поля search_source_field при каждом сохранении"""
+    search_source_field = None
+
+    def save(self, *args, **kwargs):
+        self.search_name = normalize_search_text(getattr(self, self.search_source_field))
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | {'search_name'}
+        super().save(*args, **kwargs)
+
+
+# Права каждой роли; None означает «все права». Используется и User.has_perm,
+# и закэшированной ролью запроса (см. roles.py)
+ROLE_PERMISSIONS = {
+    'admin': None,
+    'reader': frozenset({'reader.view_book', 'reader.reserve_book'}),
+    'guest': frozenset({'guest.view_book_list'}),
+}
+
+
+def role_has_perm(role, perm):
+    """Проверяет, входит ли право в набор прав роли"""
+    if role not in ROLE_PERMISSIONS:
+        return False
+    permissions = ROLE_PERMISSIONS[role]
+    return permissions is None or perm in permissions
+
+
 class User(AbstractUser):
     """Кастомная модель пользователя"""
     ROLE_CHOICES = [
@@ -24,13 +69,7 @@ class User(AbstractUser):
 
     def has_perm(self, perm):
         """Проверка прав пользователя"""
-        if self.role == 'admin':
-            return True
-        elif self.role == 'reader' and perm in ['reader.view_book', 'reader.reserve_book']:
-            return True
-        elif self.role == 'guest' and perm in ['guest.view_book_list']:
-            return True
-        return False
+        return role_has_perm(self.role, perm)
 
 
 class Reader(models.Model):
@@ -60,6 +99,11 @@ class Reader(models.Model):
         verbose_name="Дата регистрации",
         auto_now_add=True
     )
+
+    # Нормализованные ключи для индексного поиска по префиксу (заполняются в save)
+    search_name = models.CharField(max_length=100, editable=False, default='')
+    search_email = models.CharField(max_length=254, editable=False, default='')
+    phone_digits = models.CharField(max_length=20, editable=False, default='')
     
     class Meta:
         verbose_name = "Читатель"
@@ -68,10 +112,39 @@ class Reader(models.Model):
         indexes = [
             models.Index(fields=['full_name']),
             models.Index(fields=['email']),
+            models.Index(fields=['search_name']),
+            models.Index(fields=['search_email']),
+            models.Index(fields=['phone_digits']),
+            models.Index(fields=['registration_date']),
         ]
     
     def __str__(self):
         return self.full_name
+
+    @property
+    def lookup_label(self):
+        """Подпись читателя в поиске при бронировании"""
+        return f"{self.full_name} ({self.email})"
+
+    def save(self, *args, **kwargs):
+        """Обновляет поисковые ключи перед сохранением"""
+        self.search_name = normalize_search_text(self.full_name)
+        self.search_email = normalize_search_text(self.email)
+        self.phone_digits = only_digits(self.phone)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | {'search_name', 'search_email', 'phone_digits'}
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using, savepoint=False):
+            super().save(*args, **kwargs)
+            if update_fields is None or 'full_name' in update_fields:
+                self.update_search_tokens()
+
+    def update_search_tokens(self):
+        """Пересобирает слова ФИО для поиска по любому слову, а не только по фамилии"""
+        tokens = ReaderSearchToken.objects.using(self._state.db)
+        tokens.filter(reader=self).delete()
+        tokens.bulk_create(ReaderSearchToken(reader=self, token=token) for token in search_tokens(self.full_name))
     
     def get_age(self):
         """Возвращает возраст читателя"""
@@ -98,13 +171,29 @@ class Reader(models.Model):
         """Проверяет, есть ли у читателя активная бронь на книгу"""
         return self.reservations.filter(book=book, status='active').exists()
 
+class ReaderSearchToken(models.Model):
+    """Слово ФИО читателя для индексного поиска по префиксу (заполняется в Reader.save)"""
+    reader = models.ForeignKey(Reader, on_delete=models.CASCADE, related_name='search_tokens')
+    token = models.CharField(max_length=100)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['token', 'reader']),
+        ]
+
+    def __str__(self):
+        return self.token
+
+
 class BookReservation(models.Model):
     """Модель бронирования книги"""
     STATUS_CHOICES = [
         ('active', 'Активная'),
         ('completed', 'Завершена'),
         ('canceled', 'Отменена'),
+        ('expired', 'Просрочена'),
     ]
+    CLOSED_STATUSES = ['completed', 'canceled', 'expired']
     
     book = models.ForeignKey(
         'Book',
@@ -137,6 +226,8 @@ class BookReservation(models.Model):
         indexes = [
             models.Index(fields=['status']),
             models.Index(fields=['end_date']),
+            models.Index(fields=['reader', 'status', 'end_date']),
+            models.Index(fields=['book', 'status']),
         ]
         constraints = [
             models.UniqueConstraint(
@@ -154,35 +245,73 @@ class BookReservation(models.Model):
         """Проверяет, активна ли бронь"""
         return self.status == 'active' and timezone.now() < self.end_date
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Запоминаем исходное состояние для пересчета доступности книги
+        instance._loaded_availability = (
+            instance.__dict__.get('book_id'),
+            instance.__dict__.get('status'),
+        )
+        return instance
+
     def save(self, *args, **kwargs):
         """Автоматически устанавливаем дату окончания брони при создании"""
         if not self.pk and not self.end_date:
             self.end_date = timezone.now() + timedelta(days=14)  # 2 недели брони
-        super().save(*args, **kwargs)
+        # Счетчик активных броней книги обновляется в той же транзакции (см. signals.py);
+        # внутри уже открытой транзакции лишний SAVEPOINT не нужен
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using, savepoint=False):
+            super().save(*args, **kwargs)
 
-class Genre(models.Model):
+class Genre(SearchNameMixin, models.Model):
     """Модель жанра"""
+    search_source_field = 'name'
     name = models.CharField(max_length=100, verbose_name="Название жанра")
     description = models.TextField(blank=True, verbose_name="Описание")
-    
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Дата изменения")
+
+    # Денормализованное число книг (поддерживается в signals.py)
+    book_count = models.PositiveIntegerField(default=0, editable=False, verbose_name="Количество книг")
+    # Нормализованное имя для индексного поиска по префиксу (заполняется в save)
+    search_name = models.CharField(max_length=100, editable=False, default='')
+
     class Meta:
         verbose_name = "Жанр"
         verbose_name_plural = "Жанры"
         ordering = ['name']
+        indexes = [
+            models.Index(fields=['name']),
+            models.Index(fields=['-book_count', 'name']),
+            models.Index(fields=['search_name']),
+        ]
     
     def __str__(self):
         return self.name
 
-class Author(models.Model):
+class Author(SearchNameMixin, models.Model):
     """Модель автора"""
+    search_source_field = 'full_name'
     full_name = models.CharField(max_length=200, verbose_name="ФИО автора")
     birth_date = models.DateField(verbose_name="Дата рождения")
     biography = models.TextField(blank=True, verbose_name="Биография")
-    
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Дата изменения")
+
+    # Денормализованное число книг (поддерживается в signals.py)
+    book_count = models.PositiveIntegerField(default=0, editable=False, verbose_name="Количество книг")
+    # Нормализованное имя для индексного поиска по префиксу (заполняется в save)
+    search_name = models.CharField(max_length=200, editable=False, default='')
+
     class Meta:
         verbose_name = "Автор"
         verbose_name_plural = "Авторы"
         ordering = ['full_name']
+        indexes = [
+            models.Index(fields=['full_name']),
+            models.Index(fields=['-book_count', 'full_name']),
+            models.Index(fields=['search_name']),
+        ]
     
     def __str__(self):
         return self.full_name
@@ -192,8 +321,9 @@ class Author(models.Model):
         today = date.today()
         return today.year - self.birth_date.year - ((today.month, today.day) < (self.birth_date.month, self.birth_date.day))
 
-class Publisher(models.Model):
+class Publisher(SearchNameMixin, models.Model):
     """Модель издательства"""
+    search_source_field = 'name'
     name = models.CharField(max_length=200, verbose_name="Название издательства")
     country = models.CharField(max_length=100, verbose_name="Страна")
     foundation_year = models.PositiveIntegerField(
@@ -203,11 +333,22 @@ class Publisher(models.Model):
             MaxValueValidator(date.today().year)
         ]
     )
-    
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Дата изменения")
+
+    # Денормализованное число книг (поддерживается в signals.py)
+    book_count = models.PositiveIntegerField(default=0, editable=False, verbose_name="Количество книг")
+    # Нормализованное имя для индексного поиска по префиксу (заполняется в save)
+    search_name = models.CharField(max_length=200, editable=False, default='')
+
     class Meta:
         verbose_name = "Издательство"
         verbose_name_plural = "Издательства"
         ordering = ['name']
+        indexes = [
+            models.Index(fields=['name']),
+            models.Index(fields=['-book_count', 'name']),
+            models.Index(fields=['search_name']),
+        ]
     
     def __str__(self):
         return f"{self.name} ({self.country})"
@@ -241,11 +382,24 @@ class Book(models.Model):
         verbose_name="Издательство"
     )
     genres = models.ManyToManyField(Genre, verbose_name="Жанры")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Дата изменения")
+
+    # Денормализованный счетчик активных броней (поддерживается в signals.py)
+    active_reservations = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Активных броней"
+    )
+
+    # Версия закэшированной карточки книги, увеличивается при изменении ее содержимого
+    card_version = models.PositiveIntegerField(default=0, editable=False)
+
+    # Построенные миниатюры обложки: {"source": имя файла обложки, "widths": [...]} (см. thumbnails.py)
+    cover_thumbnails = models.JSONField(default=dict, blank=True, editable=False)
 
-    
     def is_available(self):
         """Проверяет, доступна ли книга для бронирования"""
-        return not self.reservations.filter(status='active').exists()
+        return self.active_reservations == 0
     
     class Meta:
         verbose_name = "Книга"
@@ -259,6 +413,20 @@ class Book(models.Model):
     
     def __str__(self):
         return self.title
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Исходное издательство нужно, чтобы отметить изменение у обоих издательств
+        instance._loaded_publisher_id = instance.__dict__.get('publisher_id')
+        return instance
+
+    def save(self, *args, **kwargs):
+        # Счетчики book_count издательств обновляются в post_save (см. signals.py)
+        # и должны зафиксироваться в одной транзакции с самой книгой
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using, savepoint=False):
+            super().save(*args, **kwargs)
     
     def get_authors_list(self):
         """Возвращает список авторов в виде строки"""
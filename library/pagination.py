@@ -0,0 +1,193 @@
+import base64
+import binascii
+import datetime
+import json
+
+from django.core.paginator import Paginator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.http import Http404
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def _encode_value(value):
+    # DjangoJSONEncoder обрезает время до миллисекунд, и строки с одинаковым
+    # усеченным значением на границе страницы терялись бы; пишем без потерь
+    if isinstance(value, datetime.datetime):
+        return {'dt': value.isoformat()}
+    if isinstance(value, datetime.date):
+        return {'date': value.isoformat()}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict):
+        if 'dt' in value:
+            return datetime.datetime.fromisoformat(value['dt'])
+        if 'date' in value:
+            return datetime.date.fromisoformat(value['date'])
+        raise ValueError('Неизвестный тип значения курсора')
+    return value
+
+
+def encode_cursor(values, direction):
+    values = [_encode_value(value) for value in values]
+    payload = json.dumps({'v': values, 'd': direction}, cls=DjangoJSONEncoder, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        values, direction = payload['v'], payload['d']
+        if direction not in ('next', 'prev') or not isinstance(values, list):
+            raise InvalidCursor('Некорректный курсор')
+        values = [_decode_value(value) for value in values]
+    except (ValueError, KeyError, TypeError, binascii.Error, UnicodeDecodeError):
+        raise InvalidCursor('Некорректный курсор')
+    return values, direction
+
+
+def _field_value(obj, field):
+    if isinstance(obj, dict):
+        if field == 'pk' and field not in obj:
+            return obj['id']
+        return obj[field]
+    for part in field.split('__'):
+        obj = getattr(obj, part)
+    return obj
+
+
+class CursorPage:
+    """Страница keyset-пагинации с непрозрачными курсорами вперед/назад"""
+
+    is_cursor = True
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """Keyset-пагинация по колонкам сортировки.
+
+    Вместо COUNT(*) и OFFSET страница выбирается условием «после последней
+    записи», поэтому стоимость любой страницы одинакова при наличии индекса
+    по колонкам сортировки. Первичный ключ добавляется в конец сортировки,
+    чтобы порядок был однозначным.
+    """
+
+    def __init__(self, queryset, ordering, per_page):
+        ordering = list(ordering)
+        if ordering[-1].lstrip('-') not in ('pk', 'id'):
+            ordering.append('-pk' if ordering[-1].startswith('-') else 'pk')
+        self.queryset = queryset
+        self.ordering = ordering
+        self.per_page = int(per_page)
+        self.fields = [field.lstrip('-') for field in ordering]
+
+    def _seek_condition(self, values, reverse):
+        """Условие «строго после values» для сортировки self.ordering"""
+        lookups = []
+        for field in self.ordering:
+            descending = field.startswith('-') != reverse
+            lookups.append((field.lstrip('-'), 'lt' if descending else 'gt'))
+
+        # Ведущая колонка ограничена диапазоном, чтобы SQL использовал индекс
+        first_field, first_lookup = lookups[0]
+        condition = Q()
+        equal = Q()
+        for (field, lookup), value in zip(lookups, values):
+            condition |= equal & Q(**{f'{field}__{lookup}': value})
+            equal &= Q(**{field: value})
+        inclusive = {'gt': 'gte', 'lt': 'lte'}[first_lookup]
+        bound = Q(**{f'{first_field}__{inclusive}': values[0]})
+        return bound & condition
+
+    def _reversed_ordering(self):
+        return [field[1:] if field.startswith('-') else f'-{field}' for field in self.ordering]
+
+    def cursor_for(self, obj, direction):
+        return encode_cursor([_field_value(obj, field) for field in self.fields], direction)
+
+    def page(self, cursor=None):
+        direction = 'next'
+        queryset = self.queryset.order_by(*self.ordering)
+        if cursor:
+            values, direction = decode_cursor(cursor)
+            if len(values) != len(self.fields):
+                raise InvalidCursor('Курсор не соответствует сортировке')
+            if direction == 'prev':
+                queryset = self.queryset.order_by(*self._reversed_ordering())
+            queryset = queryset.filter(self._seek_condition(values, reverse=direction == 'prev'))
+
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if direction == 'prev':
+            rows.reverse()
+            has_next, has_previous = bool(cursor), has_more
+        else:
+            has_next, has_previous = has_more, bool(cursor)
+
+        next_cursor = self.cursor_for(rows[-1], 'next') if has_next and rows else None
+        previous_cursor = self.cursor_for(rows[0], 'prev') if has_previous and rows else None
+        return CursorPage(rows, next_cursor, previous_cursor)
+
+
+class CursorPaginationMixin:
+    """Опциональная keyset-пагинация для ListView.
+
+    Включается параметром ``?cursor=`` (пустым для первой страницы), без него
+    работает обычный постраничный Paginator.
+    """
+
+    cursor_kwarg = 'cursor'
+    cursor_ordering = None
+
+    def get_cursor_ordering(self):
+        return self.cursor_ordering or self.get_ordering() or self.model._meta.ordering
+
+    def paginate_queryset(self, queryset, page_size):
+        if self.cursor_kwarg not in self.request.GET or not hasattr(queryset, 'order_by'):
+            return super().paginate_queryset(queryset, page_size)
+        paginator = CursorPaginator(queryset, self.get_cursor_ordering(), page_size)
+        try:
+            page = paginator.page(self.request.GET.get(self.cursor_kwarg))
+        except InvalidCursor as e:
+            raise Http404(str(e))
+        return (paginator, page, page.object_list, page.has_other_pages())
+
+
+def paginate(request, queryset, ordering, per_page, cursor_kwarg='cursor', page_kwarg='page'):
+    """Страница queryset вне ListView: keyset при ``?cursor=``, иначе номерная"""
+    if cursor_kwarg in request.GET:
+        paginator = CursorPaginator(queryset, ordering, per_page)
+        try:
+            return paginator.page(request.GET.get(cursor_kwarg))
+        except InvalidCursor as e:
+            raise Http404(str(e))
+    ordering = list(ordering)
+    if ordering[-1].lstrip('-') not in ('pk', 'id'):
+        ordering.append('pk')
+    return Paginator(queryset.order_by(*ordering), per_page).get_page(request.GET.get(page_kwarg))
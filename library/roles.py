@@ -0,0 +1,57 @@
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+from .models import Reader, role_has_perm
+
+ROLE_CACHE_TIMEOUT = 60 * 60
+
+
+def role_cache_key(user_id):
+    return f'library:role:{user_id}'
+
+
+class RequestRole:
+    """Действующая роль пользователя запроса: роль читателя, а без него — роль User"""
+
+    def __init__(self, role=None, reader_id=None):
+        self.role = role
+        self.reader_id = reader_id
+
+    @property
+    def is_admin(self):
+        return self.role == 'admin'
+
+    @property
+    def is_reader(self):
+        return self.role == 'reader' and self.reader_id is not None
+
+    def has_perm(self, perm):
+        return role_has_perm(self.role, perm)
+
+
+def resolve_role(user):
+    """Роль из кэша; при промахе — один запрос к читателю пользователя"""
+    if not user.is_authenticated:
+        return RequestRole()
+    key = role_cache_key(user.pk)
+    cached = cache.get(key)
+    if cached is None:
+        # Кэш заполняется с основной базы: отставшая реплика закэшировала бы старую роль
+        reader = Reader.objects.using(DEFAULT_DB_ALIAS).filter(user_id=user.pk).values_list('role', 'pk').first()
+        cached = reader or (user.role, None)
+        cache.set(key, cached, ROLE_CACHE_TIMEOUT)
+    role, reader_id = cached
+    return RequestRole(role, reader_id)
+
+
+def invalidate_role(user_id):
+    """Сбрасывает закэшированную роль; вызывается при изменении User или Reader"""
+    if user_id:
+        cache.delete(role_cache_key(user_id))
+
+
+def invalidate_roles(user_ids):
+    """Сбрасывает роли пачки пользователей (массовое изменение ролей в админке)"""
+    keys = [role_cache_key(user_id) for user_id in set(user_ids) if user_id]
+    if keys:
+        cache.delete_many(keys)
@@ -0,0 +1,60 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Разрешено ли текущему запросу читать с реплики. По умолчанию нет: команды,
+# фоновые потоки и тесты работают с основной базой; чтение с реплик включает
+# ReplicaRoutingMiddleware для безопасных запросов без недавней записи
+_replica_reads = ContextVar('library_replica_reads', default=False)
+
+
+def replica_aliases():
+    return list(getattr(settings, 'DATABASE_REPLICAS', []))
+
+
+@contextmanager
+def replica_reads(enabled=True):
+    """Включает (или запрещает) чтение моделей library с реплик внутри блока"""
+    token = _replica_reads.set(enabled)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+class ReplicaRouter:
+    """Читает модели library с реплик, пишет в основную базу.
+
+    Реплика выбирается случайно для каждого запроса к БД. Внутри транзакции
+    основной базы чтение остается на ней, чтобы видеть собственные записи.
+    Таблицы остальных приложений (сессии, contenttypes, auth) не маршрутизируются.
+    """
+
+    app_labels = {'library'}
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label not in self.app_labels or not _replica_reads.get():
+            return None
+        replicas = replica_aliases()
+        if not replicas or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики — копии основной базы, поэтому связи между ними допустимы
+        databases = {DEFAULT_DB_ALIAS, *replica_aliases()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Схема реплик приходит вместе с копией основной базы (sync_replica)
+        if db in replica_aliases():
+            return False
+        return None
@@ -0,0 +1,201 @@
+import re
+
+from django.db import connection
+from django.db.models import Q
+
+from .models import Book, Reader, ReaderSearchToken, normalize_search_text, only_digits
+
+# Виртуальная таблица создается миграцией 0003_book_search_index
+FTS_TABLE = 'library_book_fts'
+
+# Веса колонок для bm25: совпадение в названии важнее совпадения в описании
+RANK_WEIGHTS = (10.0, 1.0, 5.0, 2.0, 2.0)
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+PHONE_QUERY_RE = re.compile(r'^[\d\s()+-]+$')
+
+# Поиск по телефону имеет смысл начиная с нескольких цифр
+MIN_PHONE_DIGITS = 3
+
+
+def fts_enabled():
+    """FTS5-индекс есть только у SQLite"""
+    return connection.vendor == 'sqlite'
+
+
+def build_match_query(query):
+    """Превращает пользовательский ввод в безопасное выражение MATCH.
+
+    Каждое слово ищется как префикс, все слова должны присутствовать.
+    """
+    tokens = TOKEN_RE.findall(query.lower())
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def _book_documents(book_ids):
+    books = (
+        Book.objects
+        .filter(pk__in=book_ids)
+        .select_related('publisher')
+        .prefetch_related('authors', 'genres')
+    )
+    for book in books:
+        yield (
+            book.pk,
+            book.title,
+            book.description,
+            book.get_authors_list(),
+            book.get_genres_list(),
+            book.publisher.name if book.publisher else '',
+        )
+
+
+def remove_books(book_ids):
+    """Удаляет книги из поискового индекса"""
+    book_ids = list(book_ids)
+    if not book_ids or not fts_enabled():
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+            [(book_id,) for book_id in book_ids],
+        )
+
+
+def add_documents(documents):
+    """Добавляет в индекс готовые строки (id, title, description, authors, genres, publisher)"""
+    documents = list(documents)
+    if not documents or not fts_enabled():
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'INSERT INTO {FTS_TABLE} (rowid, title, description, authors, genres, publisher) '
+            'VALUES (%s, %s, %s, %s, %s, %s)',
+            documents,
+        )
+
+
+def index_books(book_ids):
+    """Переиндексирует указанные книги"""
+    book_ids = list(book_ids)
+    if not book_ids or not fts_enabled():
+        return
+    remove_books(book_ids)
+    add_documents(_book_documents(book_ids))
+
+
+def rebuild_index(batch_size=1000):
+    """Полностью перестраивает поисковый индекс каталога, возвращает число книг"""
+    if not fts_enabled():
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+    total = 0
+    batch = []
+    for book_id in Book.objects.order_by('pk').values_list('pk', flat=True).iterator():
+        batch.append(book_id)
+        if len(batch) >= batch_size:
+            index_books(batch)
+            total += len(batch)
+            batch = []
+    if batch:
+        index_books(batch)
+        total += len(batch)
+    return total
+
+
+class BookSearchResults:
+    """Ленивый результат полнотекстового поиска, совместимый с Paginator.
+
+    Считает совпадения и выбирает страницу по индексу FTS5, после чего
+    загружает только книги текущей страницы в порядке релевантности.
+    """
+
+    def __init__(self, query, queryset=None):
+        self.query = query
+        self.match = build_match_query(query)
+        self.queryset = queryset if queryset is not None else Book.objects.all()
+        self._count = None
+
+    def count(self):
+        if self._count is None:
+            if not self.match:
+                self._count = 0
+            elif fts_enabled():
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        f'SELECT COUNT(*) FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+                        [self.match],
+                    )
+                    self._count = cursor.fetchone()[0]
+            else:
+                self._count = self._fallback_queryset().count()
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def _fallback_queryset(self):
+        books = self.queryset
+        for token in TOKEN_RE.findall(self.query):
+            books = books.filter(title__icontains=token)
+        return books
+
+    def _ranked_ids(self, offset, limit):
+        weights = ', '.join(str(weight) for weight in RANK_WEIGHTS)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+                f'ORDER BY bm25({FTS_TABLE}, {weights}) LIMIT %s OFFSET %s',
+                [self.match, limit, offset],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def __getitem__(self, item):
+        if not isinstance(item, slice):
+            return self[item:item + 1][0]
+        start = item.start or 0
+        stop = item.stop if item.stop is not None else self.count()
+        if not self.match or stop <= start:
+            return []
+        if not fts_enabled():
+            return list(self._fallback_queryset()[start:stop])
+        ids = self._ranked_ids(start, stop - start)
+        books = self.queryset.in_bulk(ids)
+        return [books[book_id] for book_id in ids if book_id in books]
+
+
+def prefix_q(field, prefix):
+    """Условие «начинается с» в виде диапазона.
+
+    В отличие от LIKE, диапазон всегда обслуживается обычным B-tree индексом.
+    """
+    return Q(**{f'{field}__gte': prefix, f'{field}__lt': prefix + '\U0010ffff'})
+
+
+def search_readers(query, queryset=None):
+    """Ищет читателей по началу слов ФИО, email или номера телефона.
+
+    Каждое слово запроса должно быть началом какого-то слова ФИО, поэтому
+    находятся и «петрова алена», и «сергеевна».
+    """
+    readers = queryset if queryset is not None else Reader.objects.all()
+    text = normalize_search_text(query)
+    if not text:
+        return readers
+    by_name = Q()
+    for word in text.split():
+        by_name &= Q(pk__in=ReaderSearchToken.objects.filter(prefix_q('token', word)).values('reader_id'))
+    condition = by_name | prefix_q('search_email', text)
+    digits = only_digits(query)
+    if PHONE_QUERY_RE.match(query.strip()) and len(digits) >= MIN_PHONE_DIGITS:
+        condition |= prefix_q('phone_digits', digits)
+    return readers.filter(condition)
+
+
+def search_by_name(queryset, query):
+    """Ищет авторов, издательства или жанры по началу имени (индекс search_name)"""
+    text = normalize_search_text(query)
+    if not text:
+        return queryset
+    return queryset.filter(prefix_q('search_name', text))
@@ -0,0 +1,200 @@
+from collections import Counter
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Author, Book, BookReservation, Genre, Publisher
+
+
+def adjust_active_reservations(book_id, delta):
+    """Атомарно сдвигает счетчик активных броней книги на delta"""
+    if not book_id or not delta:
+        return
+    books = Book.objects.filter(pk=book_id)
+    if delta < 0:
+        # Не уходим в минус, если счетчик уже рассинхронизирован
+        books = books.filter(active_reservations__gte=-delta)
+    # Доступность видна на странице книги, поэтому двигаем и updated_at
+    books.update(active_reservations=F('active_reservations') + delta, updated_at=timezone.now())
+
+
+class ReservationConflict(Exception):
+    """Книга уже забронирована (или у читателя уже есть активная бронь)"""
+
+
+def reserve_book(book_id, reader, end_date=None):
+    """Атомарно бронирует книгу.
+
+    Книга захватывается условным UPDATE счетчика активных броней: из
+    параллельных запросов его выполнит только один, остальные получат 0
+    измененных строк и ReservationConflict без проверки «прочитал, потом
+    вставил». Бронь вставляется в той же транзакции.
+    """
+    now = timezone.now()
+    reservation = BookReservation(
+        book_id=book_id,
+        reader=reader,
+        status='active',
+        end_date=end_date or now + timedelta(days=14),
+    )
+    # Счетчик уже увеличен условным UPDATE, сигнал post_save не должен менять его повторно
+    reservation._loaded_availability = (book_id, 'active')
+    try:
+        with transaction.atomic():
+            claimed = Book.objects.filter(pk=book_id, active_reservations=0).update(
+                active_reservations=F('active_reservations') + 1,
+                updated_at=now,
+            )
+            if not claimed:
+                raise ReservationConflict('Эта книга уже забронирована')
+            reservation.save(force_insert=True)
+    except IntegrityError:
+        # Счетчик рассинхронизирован с таблицей броней; откат вернул его назад
+        raise ReservationConflict('У этого читателя уже есть активная бронь на эту книгу')
+    return reservation
+
+def bump_card_versions(book_ids):
+    """Инвалидирует закэшированные карточки и страницы книг (версия и updated_at)"""
+    book_ids = list(book_ids)
+    if book_ids:
+        Book.objects.filter(pk__in=book_ids).update(
+            card_version=F('card_version') + 1,
+            updated_at=timezone.now(),
+        )
+
+
+def touch(model, pks):
+    """Обновляет updated_at у записей, чей список связанных книг изменился"""
+    pks = [pk for pk in set(pks) if pk]
+    if pks:
+        model.objects.filter(pk__in=pks).update(updated_at=timezone.now())
+
+
+def recount_active_reservations(book_ids=None):
+    """Пересчитывает счетчики активных броней по таблице броней.
+
+    Обновляет только книги с расхождением и возвращает их количество.
+    """
+    actual = (
+        BookReservation.objects
+        .filter(book=OuterRef('pk'), status='active')
+        .order_by()
+        .values('book')
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    books = Book.objects.all()
+    if book_ids is not None:
+        books = books.filter(pk__in=book_ids)
+    stale = (
+        books
+        .annotate(actual=Coalesce(Subquery(actual), 0))
+        .exclude(active_reservations=F('actual'))
+        .values_list('pk', flat=True)
+    )
+    stale_ids = list(stale)
+    if stale_ids:
+        Book.objects.filter(pk__in=stale_ids).update(
+            active_reservations=Coalesce(Subquery(actual), 0),
+            updated_at=timezone.now(),
+        )
+    return len(stale_ids)
+
+
+# Модель -> поле Book, по которому считается book_count
+BOOK_COUNT_LOOKUPS = {
+    Author: 'authors',
+    Genre: 'genres',
+    Publisher: 'publisher',
+}
+
+
+def adjust_book_counts(model, pks, delta=1):
+    """Атомарно сдвигает book_count на delta у каждой записи pks (с учетом повторов)"""
+    if not delta:
+        return
+    by_delta = {}
+    for pk, count in Counter(pk for pk in pks if pk).items():
+        by_delta.setdefault(count * delta, []).append(pk)
+    for change, ids in by_delta.items():
+        rows = model.objects.filter(pk__in=ids)
+        if change < 0:
+            rows = rows.filter(book_count__gte=-change)
+        rows.update(book_count=F('book_count') + change)
+
+
+def recount_book_counts(model, pks=None):
+    """Пересчитывает book_count по связям книг; возвращает число исправленных записей"""
+    lookup = BOOK_COUNT_LOOKUPS[model]
+    actual = (
+        Book.objects
+        .filter(**{lookup: OuterRef('pk')})
+        .order_by()
+        .values(lookup)
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    rows = model.objects.all()
+    if pks is not None:
+        rows = rows.filter(pk__in=pks)
+    stale_ids = list(
+        rows
+        .annotate(actual=Coalesce(Subquery(actual), 0))
+        .exclude(book_count=F('actual'))
+        .values_list('pk', flat=True)
+    )
+    if stale_ids:
+        model.objects.filter(pk__in=stale_ids).update(book_count=Coalesce(Subquery(actual), 0))
+    return len(stale_ids)
+
+
+def close_reservations(reservations, status):
+    """Закрывает активные брони из queryset одним UPDATE.
+
+    Сигналы post_save при этом не срабатывают, поэтому счетчики доступности
+    затронутых книг пересчитываются в той же транзакции. Возвращает число
+    закрытых броней.
+    """
+    if status not in BookReservation.CLOSED_STATUSES:
+        raise ValueError(f'Статус {status!r} не закрывает бронь')
+    with transaction.atomic():
+        active = reservations.filter(status='active')
+        book_ids = set(active.values_list('book_id', flat=True))
+        closed = active.update(status=status)
+        recount_active_reservations(book_ids)
+    return closed
+
+
+def extend_reservations(reservations, days=14):
+    """Продлевает активные брони из queryset на days дней одним UPDATE"""
+    return reservations.filter(status='active').update(end_date=F('end_date') + timedelta(days=days))
+
+
+def expire_reservations(now=None, chunk_size=1000):
+    """Переводит просроченные активные брони в статус expired.
+
+    Брони выбираются по индексу end_date и обновляются пачками по chunk_size
+    строк, чтобы не держать длинную блокировку записи. Счетчики доступности
+    затронутых книг пересчитываются в той же транзакции. Возвращает число
+    просроченных броней.
+    """
+    now = now or timezone.now()
+    expired = 0
+    while True:
+        with transaction.atomic():
+            rows = list(
+                BookReservation.objects
+                .filter(status='active', end_date__lt=now)
+                .order_by('end_date')
+                .values_list('pk', 'book_id')[:chunk_size]
+            )
+            if not rows:
+                return expired
+            # Повторная проверка статуса защищает от броней, закрытых параллельно
+            expired += BookReservation.objects.filter(
+                pk__in=[pk for pk, _ in rows], status='active'
+            ).update(status='expired')
+            recount_active_reservations({book_id for _, book_id in rows})
@@ -0,0 +1,154 @@
+from django.db.backends.signals import connection_created
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import search, thumbnails
+from .db import apply_sqlite_pragmas
+from .models import Author, Book, BookReservation, Genre, Publisher, Reader, User
+from .roles import invalidate_role
+from .services import adjust_active_reservations, adjust_book_counts, bump_card_versions, touch
+
+
+@receiver(post_save, sender=BookReservation)
+def sync_availability_on_save(sender, instance, **kwargs):
+    """Обновляет счетчик активных броней книги при создании и смене статуса брони"""
+    previous_book_id, previous_status = getattr(instance, '_loaded_availability', (None, None))
+    was_active = previous_status == 'active'
+    is_active = instance.status == 'active'
+    moved = previous_book_id != instance.book_id
+
+    if was_active and (not is_active or moved):
+        adjust_active_reservations(previous_book_id, -1)
+    if is_active and (not was_active or moved):
+        adjust_active_reservations(instance.book_id, 1)
+
+    instance._loaded_availability = (instance.book_id, instance.status)
+
+
+@receiver(post_delete, sender=BookReservation)
+def sync_availability_on_delete(sender, instance, **kwargs):
+    """Освобождает книгу при удалении активной брони"""
+    book_id, status = getattr(
+        instance, '_loaded_availability', (instance.book_id, instance.status)
+    )
+    if status == 'active':
+        adjust_active_reservations(book_id, -1)
+
+
+# Синхронизация полнотекстового индекса, кэша карточек и updated_at каталога
+
+def _books_changed(book_ids):
+    book_ids = list(book_ids)
+    search.index_books(book_ids)
+    bump_card_versions(book_ids)
+
+
+def _m2m_field(sender):
+    return 'authors' if sender is Book.authors.through else 'genres'
+
+
+@receiver(post_save, sender=Book)
+def refresh_book_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    _books_changed([instance.pk])
+    previous_publisher_id = getattr(instance, '_loaded_publisher_id', None)
+    if previous_publisher_id != instance.publisher_id:
+        # Книга ушла из одного издательства и появилась в другом
+        touch(Publisher, [previous_publisher_id, instance.publisher_id])
+        adjust_book_counts(Publisher, [previous_publisher_id], -1)
+        adjust_book_counts(Publisher, [instance.publisher_id], 1)
+    instance._loaded_publisher_id = instance.publisher_id
+    cover = instance.cover.name if instance.cover else ''
+    if cover != (instance.cover_thumbnails or {}).get('source', ''):
+        # Новая или удаленная обложка: миниатюры перестраиваются в фоне
+        thumbnails.schedule(instance.pk)
+
+
+@receiver(pre_delete, sender=Book)
+def remember_book_relations(sender, instance, **kwargs):
+    instance._related_ids = {
+        Author: list(instance.authors.values_list('pk', flat=True)),
+        Genre: list(instance.genres.values_list('pk', flat=True)),
+        Publisher: [instance.publisher_id],
+    }
+
+
+@receiver(post_delete, sender=Book)
+def refresh_relations_on_book_delete(sender, instance, **kwargs):
+    search.remove_books([instance.pk])
+    for model, pks in getattr(instance, '_related_ids', {}).items():
+        touch(model, pks)
+        adjust_book_counts(model, pks, -1)
+
+
+@receiver(m2m_changed, sender=Book.authors.through)
+@receiver(m2m_changed, sender=Book.genres.through)
+def refresh_on_m2m_change(sender, instance, action, reverse, model, pk_set, **kwargs):
+    if action in ('pre_clear', 'pre_remove'):
+        # При clear() pk_set не передается, а при remove() в нем могут быть
+        # несвязанные записи, поэтому запоминаем реально существующие связи
+        related = instance.book_set.all() if reverse else getattr(instance, _m2m_field(sender)).all()
+        if action == 'pre_remove':
+            related = related.filter(pk__in=pk_set)
+        instance._removed_ids = list(related.values_list('pk', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    # В post_add pk_set содержит только действительно добавленные связи
+    changed_ids = (pk_set or []) if action == 'post_add' else getattr(instance, '_removed_ids', [])
+    delta = 1 if action == 'post_add' else -1
+    if reverse:
+        # Изменился список книг автора/жанра
+        _books_changed(changed_ids)
+        touch(type(instance), [instance.pk])
+        adjust_book_counts(type(instance), [instance.pk], delta * len(changed_ids))
+    else:
+        _books_changed([instance.pk])
+        touch(model, changed_ids)
+        adjust_book_counts(model, changed_ids, delta)
+
+
+@receiver(post_save, sender=Author)
+@receiver(post_save, sender=Genre)
+@receiver(post_save, sender=Publisher)
+def refresh_related_books(sender, instance, created=False, raw=False, **kwargs):
+    if created or raw:
+        return
+    _books_changed(instance.book_set.values_list('pk', flat=True))
+
+
+@receiver(pre_delete, sender=Author)
+@receiver(pre_delete, sender=Genre)
+@receiver(pre_delete, sender=Publisher)
+def remember_related_books(sender, instance, **kwargs):
+    instance._related_book_ids = list(instance.book_set.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Author)
+@receiver(post_delete, sender=Genre)
+@receiver(post_delete, sender=Publisher)
+def refresh_books_after_delete(sender, instance, **kwargs):
+    _books_changed(getattr(instance, '_related_book_ids', []))
+
+
+# Кэш ролей пользователей
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_role(sender, instance, **kwargs):
+    invalidate_role(instance.pk)
+
+
+@receiver(post_save, sender=Reader)
+@receiver(post_delete, sender=Reader)
+def invalidate_reader_role(sender, instance, **kwargs):
+    invalidate_role(instance.user_id)
+
+
+# Настройка соединений с БД
+
+@receiver(connection_created)
+def configure_connection(sender, connection, **kwargs):
+    apply_sqlite_pragmas(connection)
@@ -0,0 +1,74 @@
+import mimetypes
+import os
+
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+
+# Порядок предпочтения сжатых вариантов
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+# Файлы без хэша в имени (например, запрошенные по старой ссылке) кэшируем коротко
+DEFAULT_CACHE_CONTROL = 'public, max-age=300'
+
+
+def accepted_encodings(header):
+    """Кодировки из Accept-Encoding, кроме явно запрещенных через q=0"""
+    encodings = set()
+    for item in header.split(','):
+        encoding, _, params = item.partition(';')
+        encoding = encoding.strip().lower()
+        params = params.strip()
+        try:
+            quality = float(params[2:]) if params.startswith('q=') else 1.0
+        except ValueError:
+            quality = 1.0
+        if encoding and quality > 0:
+            encodings.add(encoding)
+    return encodings
+
+
+def _hashed_names(storage):
+    """Имена с хэшем из манифеста; множество строится один раз на загруженный манифест"""
+    hashed_files = getattr(storage, 'hashed_files', {})
+    cached = getattr(storage, '_hashed_names_cache', None)
+    if cached is None or cached[0] is not hashed_files:
+        cached = (hashed_files, frozenset(hashed_files.values()))
+        storage._hashed_names_cache = cached
+    return cached[1]
+
+
+@require_safe
+def serve_static(request, path):
+    """Отдает собранную статику из STATIC_ROOT, выбирая .br/.gz по Accept-Encoding"""
+    try:
+        full_path = staticfiles_storage.path(path)
+    except (SuspiciousFileOperation, NotImplementedError):
+        raise Http404("Файл не найден")
+    if not os.path.isfile(full_path):
+        raise Http404("Файл не найден")
+
+    content_type, _ = mimetypes.guess_type(full_path)
+    accepted = accepted_encodings(request.headers.get('Accept-Encoding', ''))
+    encoding = None
+    for name, suffix in ENCODINGS:
+        if (name in accepted or '*' in accepted) and os.path.isfile(full_path + suffix):
+            encoding, full_path = name, full_path + suffix
+            break
+
+    response = FileResponse(
+        open(full_path, 'rb'),
+        content_type=content_type or 'application/octet-stream',
+        filename=os.path.basename(path),
+    )
+    if encoding:
+        response['Content-Encoding'] = encoding
+    response['Vary'] = 'Accept-Encoding'
+    response['Last-Modified'] = http_date(os.path.getmtime(full_path))
+    response['Cache-Control'] = (
+        IMMUTABLE_CACHE_CONTROL if path in _hashed_names(staticfiles_storage) else DEFAULT_CACHE_CONTROL
+    )
+    return response
@@ -0,0 +1,129 @@
+// Автодополнение выбора читателя или записи справочника: запрашивает не больше N совпадений у сервера
+document.addEventListener('DOMContentLoaded', function() {
+    const MIN_LENGTH = 2;
+    const DELAY = 250;
+
+    document.querySelectorAll('.autocomplete').forEach(container => {
+        const input = container.querySelector('.autocomplete-input');
+        const value = container.querySelector('.autocomplete-value');
+        const list = container.querySelector('.autocomplete-results');
+        let timer = null;
+        let controller = null;
+        let active = -1;
+
+        function close() {
+            list.hidden = true;
+            list.innerHTML = '';
+            active = -1;
+            input.setAttribute('aria-expanded', 'false');
+        }
+
+        function select(item) {
+            if (value.tagName === 'SELECT') {
+                // Справочник: выбранная запись добавляется в <select>, поле поиска очищается
+                let option = Array.from(value.options).find(option => option.value === item.dataset.id);
+                if (!option) {
+                    option = new Option(item.textContent, item.dataset.id);
+                    value.add(option);
+                }
+                option.selected = true;
+                input.value = '';
+            } else {
+                value.value = item.dataset.id;
+                input.value = item.textContent;
+            }
+            close();
+        }
+
+        function highlight(index) {
+            const items = list.querySelectorAll('li[data-id]');
+            if (!items.length) {
+                return;
+            }
+            active = (index + items.length) % items.length;
+            items.forEach((item, i) => item.classList.toggle('active', i === active));
+        }
+
+        function render(results) {
+            list.innerHTML = '';
+            if (!results.length) {
+                const empty = document.createElement('li');
+                empty.className = 'autocomplete-empty';
+                empty.textContent = container.dataset.empty || 'Читатели не найдены';
+                list.appendChild(empty);
+            }
+            results.forEach(result => {
+                const item = document.createElement('li');
+                item.dataset.id = result.id;
+                item.textContent = result.text;
+                item.setAttribute('role', 'option');
+                item.addEventListener('mousedown', event => {
+                    event.preventDefault();
+                    select(item);
+                });
+                list.appendChild(item);
+            });
+            list.hidden = false;
+            input.setAttribute('aria-expanded', 'true');
+        }
+
+        function search() {
+            const query = input.value.trim();
+            if (query.length < MIN_LENGTH) {
+                close();
+                return;
+            }
+            // Отменяем предыдущий запрос, чтобы устаревший ответ не перетер новый
+            if (controller) {
+                controller.abort();
+            }
+            controller = new AbortController();
+            fetch(`${container.dataset.url}?q=${encodeURIComponent(query)}`, {
+                signal: controller.signal,
+                headers: {'Accept': 'application/json'},
+            })
+                .then(response => response.json())
+                .then(data => render(data.results))
+                .catch(error => {
+                    if (error.name !== 'AbortError') {
+                        close();
+                    }
+                });
+        }
+
+        input.addEventListener('input', () => {
+            // Выбранный ранее читатель больше не соответствует тексту
+            if (value.tagName !== 'SELECT') {
+                value.value = '';
+            }
+            clearTimeout(timer);
+            timer = setTimeout(search, DELAY);
+        });
+
+        input.addEventListener('keydown', event => {
+            if (list.hidden) {
+                return;
+            }
+            if (event.key === 'ArrowDown' || event.key === 'ArrowUp') {
+                event.preventDefault();
+                highlight(active + (event.key === 'ArrowDown' ? 1 : -1));
+            } else if (event.key === 'Enter' && active >= 0) {
+                event.preventDefault();
+                select(list.querySelectorAll('li[data-id]')[active]);
+            } else if (event.key === 'Escape') {
+                close();
+            }
+        });
+
+        input.addEventListener('blur', close);
+
+        if (value.tagName === 'SELECT' && value.multiple) {
+            // Двойной щелчок убирает запись из выбранных
+            value.addEventListener('dblclick', event => {
+                if (event.target.tagName === 'OPTION') {
+                    event.target.remove();
+                }
+            });
+        }
+    });
+});
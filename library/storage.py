@@ -0,0 +1,60 @@
+import gzip
+import os
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:  # brotli необязателен: без него собираются только .gz
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = {'.css', '.js', '.map', '.svg', '.json', '.txt', '.xml', '.html'}
+
+# Сжатые варианты не пишем, если они экономят меньше этой доли размера
+MIN_SAVING = 0.05
+
+
+def _gzip(data):
+    # mtime=0 делает результат детерминированным между сборками
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def _brotli(data):
+    return brotli.compress(data, quality=11)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Хэшированные имена файлов плюс предварительно сжатые копии .gz и .br.
+
+    Файлы с хэшем в имени никогда не меняются, поэтому их можно отдавать с
+    Cache-Control: immutable (см. library/static.py), а сжатые копии
+    избавляют сервер от сжатия на каждый запрос.
+    """
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+        for name in set(self.hashed_files.values()):
+            for compressed in self.compress(name):
+                yield name, compressed, True
+
+    def compressors(self):
+        compressors = [('.gz', _gzip)]
+        if brotli is not None:
+            compressors.append(('.br', _brotli))
+        return compressors
+
+    def compress(self, name):
+        if os.path.splitext(name)[1].lower() not in COMPRESSIBLE_EXTENSIONS:
+            return
+        with self.open(name) as f:
+            data = f.read()
+        for suffix, compress in self.compressors():
+            compressed = compress(data)
+            if len(compressed) > len(data) * (1 - MIN_SAVING):
+                continue
+            target = self.path(name + suffix)
+            with open(target, 'wb') as f:
+                f.write(compressed)
+            yield name + suffix
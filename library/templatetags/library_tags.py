@@ -0,0 +1,66 @@
+from django import template
+from django.core.cache import cache
+from django.db.models import prefetch_related_objects
+from django.core.files.storage import default_storage
+from django.template.loader import render_to_string
+from django.utils.html import format_html
+from django.utils.safestring import mark_safe
+
+from library.thumbnails import thumbnail_name, thumbnail_widths
+
+register = template.Library()
+
+BOOK_CARD_TEMPLATE = 'library/includes/book_card.html'
+BOOK_CARD_TIMEOUT = 60 * 60 * 24
+
+
+def book_card_key(book):
+    """Ключ карточки включает версию книги, поэтому старые версии просто вытесняются"""
+    return f'library:book_card:{book.pk}:{book.card_version}'
+
+
+@register.simple_tag
+def book_cards(books):
+    """Выводит карточки книг, беря готовый HTML из кэша одним get_many"""
+    books = list(books)
+    keys = {book.pk: book_card_key(book) for book in books}
+    cached = cache.get_many(keys.values())
+
+    missing = [book for book in books if keys[book.pk] not in cached]
+    if missing:
+        # Авторов загружаем только для карточек, которых нет в кэше
+        prefetch_related_objects(missing, 'authors')
+        rendered = {
+            keys[book.pk]: render_to_string(BOOK_CARD_TEMPLATE, {'book': book})
+            for book in missing
+        }
+        cache.set_many(rendered, BOOK_CARD_TIMEOUT)
+        cached.update(rendered)
+
+    return mark_safe(''.join(cached[keys[book.pk]] for book in books))
+
+
+def _srcset(name, widths, fmt):
+    return ', '.join(f'{default_storage.url(thumbnail_name(name, width, fmt))} {width}w' for width in widths)
+
+
+@register.simple_tag
+def cover_image(book, width=100, sizes=None, css_class='book-cover', alt=None):
+    """<picture> с миниатюрами обложки WebP/JPEG; пока их нет — оригинал с шириной width"""
+    if not book.cover:
+        return ''
+    alt = book.title if alt is None else alt
+    widths = thumbnail_widths(book.cover_thumbnails, book.cover.name)
+    if not widths:
+        return format_html('<img src="{}" alt="{}" class="{}" width="{}" loading="lazy">',
+                           book.cover.url, alt, css_class, width)
+    sizes = sizes or f'{width}px'
+    # В src — самая маленькая миниатюра не меньше нужной ширины
+    fallback = next((w for w in widths if w >= width), widths[-1])
+    return format_html(
+        '<picture>{}<img src="{}" srcset="{}" sizes="{}" alt="{}" class="{}" width="{}" loading="lazy"></picture>',
+        format_html('<source type="image/webp" srcset="{}" sizes="{}">', _srcset(book.cover.name, widths, 'webp'), sizes),
+        default_storage.url(thumbnail_name(book.cover.name, fallback, 'jpeg')),
+        _srcset(book.cover.name, widths, 'jpeg'),
+        sizes, alt, css_class, width,
+    )
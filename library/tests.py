@@ -1,3 +1,992 @@
-from django.test import TestCase
+import csv
+import gzip
+import json
+import os
+import sqlite3
+import tempfile
+from datetime import date, timedelta
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.sessions.models import Session
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.db import connection
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from .admin import BookCountFieldListFilter
+from .db import PRODUCTION_PRAGMAS, sqlite_pragmas
+from .forms import BookForm
+from .instrumentation import QueryStats, fingerprint, report
+from .middleware import REPLICA_PIN_COOKIE, ReplicaRoutingMiddleware
+from .pagination import CursorPaginator
+from .roles import resolve_role
+from .routers import ReplicaRouter
+from .services import ReservationConflict, reserve_book
+from .signals import configure_connection
+from .static import _hashed_names
+from .models import Author, Book, BookReservation, Genre, Publisher, Reader, User
+
+
+def create_reader(email='reader@example.com', full_name='Иванов Иван Иванович', phone='+79991234567'):
+    user = User.objects.create_user(username=email, email=email, password='testpass123')
+    return Reader.objects.create(
+        user=user,
+        full_name=full_name,
+        birth_date=date(1990, 1, 1),
+        address='Москва',
+        phone=phone,
+        email=email,
+    )
+
+
+def create_book(title='Евгений Онегин', isbn='9785171234567', **kwargs):
+    return Book.objects.create(title=title, isbn=isbn, publication_year=1833, **kwargs)
+
+
+class BookAvailabilityTestCase(TestCase):
+    def setUp(self):
+        self.book = create_book()
+        self.reader = create_reader()
+
+    def test_reservation_lifecycle_updates_counter(self):
+        reservation = BookReservation.objects.create(book=self.book, reader=self.reader)
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.active_reservations, 1)
+        self.assertFalse(self.book.is_available())
+
+        reservation.status = 'completed'
+        reservation.save()
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.active_reservations, 0)
+        self.assertTrue(self.book.is_available())
+
+    def test_reloaded_reservation_cancel_and_delete(self):
+        BookReservation.objects.create(book=self.book, reader=self.reader)
+        reservation = BookReservation.objects.get(book=self.book)
+        reservation.delete()
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.active_reservations, 0)
+
+    def test_is_available_does_not_query(self):
+        with self.assertNumQueries(0):
+            self.assertTrue(self.book.is_available())
+
+    def test_rebuild_availability_command(self):
+        BookReservation.objects.create(book=self.book, reader=self.reader)
+        Book.objects.filter(pk=self.book.pk).update(active_reservations=0)
+        call_command('rebuild_availability', stdout=StringIO())
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.active_reservations, 1)
+
+    def test_reserve_page_for_booked_book(self):
+        BookReservation.objects.create(book=self.book, reader=self.reader)
+        response = self.client.get(reverse('library:book_reserve', args=[self.book.pk]))
+        self.assertContains(response, 'Бронирование невозможно')
+
+    def test_expire_reservations_command(self):
+        other = create_book(title='Война и мир', isbn='9785170000001')
+        overdue = BookReservation.objects.create(
+            book=self.book, reader=self.reader, end_date=timezone.now() - timedelta(days=1),
+        )
+        current = BookReservation.objects.create(book=other, reader=self.reader)
+        out = StringIO()
+        call_command('expire_reservations', '--chunk-size', '1', stdout=out)
+        self.assertIn('Просрочено броней: 1', out.getvalue())
+
+        overdue.refresh_from_db()
+        current.refresh_from_db()
+        self.book.refresh_from_db()
+        self.assertEqual(overdue.status, 'expired')
+        self.assertEqual(current.status, 'active')
+        self.assertTrue(self.book.is_available())
+        # Просроченная бронь больше не мешает повторному бронированию
+        BookReservation.objects.create(book=self.book, reader=self.reader)
+
+    def test_reserve_book_claims_once(self):
+        other = create_reader(email='other@example.com')
+        with self.assertNumQueries(4):  # SAVEPOINT, условный UPDATE, INSERT, RELEASE SAVEPOINT
+            reserve_book(self.book.pk, self.reader)
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.active_reservations, 1)
+        with self.assertRaises(ReservationConflict):
+            reserve_book(self.book.pk, other)
+        self.assertEqual(BookReservation.objects.filter(book=self.book).count(), 1)
+
+    def test_reserve_view_reports_conflict(self):
+        url = reverse('library:book_reserve', args=[self.book.pk])
+        response = self.client.post(url, {'book': self.book.pk, 'reader': self.reader.pk})
+        self.assertRedirects(response, reverse('library:reader_reservations', args=[self.reader.pk]))
+        # Вторая вкладка со старой страницей: счетчик в форме устарел, но захват не проходит
+        Book.objects.filter(pk=self.book.pk).update(active_reservations=0)
+        response = self.client.post(url, {'book': self.book.pk, 'reader': self.reader.pk})
+        self.assertContains(response, 'У этого читателя уже есть активная бронь')
+        self.assertEqual(BookReservation.objects.filter(book=self.book).count(), 1)
+
+
+class ReaderReservationsTestCase(TestCase):
+    def setUp(self):
+        self.reader = create_reader()
+        now = timezone.now()
+        self.active = BookReservation.objects.create(
+            book=create_book(isbn='9785170000100'), reader=self.reader, end_date=now + timedelta(days=3),
+        )
+        book = create_book(title='Война и мир', isbn='9785170000101')
+        BookReservation.objects.bulk_create([
+            BookReservation(book=book, reader=self.reader, status='completed', end_date=now - timedelta(days=day))
+            for day in range(1, 31)
+        ])
+
+    def test_active_first_and_history_paginated(self):
+        url = reverse('library:reader_reservations', args=[self.reader.pk])
+        response = self.client.get(url)
+        self.assertEqual(list(response.context['active_reservations']), [self.active])
+        history = response.context['page_obj']
+        self.assertEqual(len(history), 25)
+        self.assertEqual(history.paginator.count, 30)
+        self.assertTrue(all(a.end_date > b.end_date for a, b in zip(history, history[1:])))
+        response = self.client.get(url, {'page': 2})
+        self.assertEqual(len(response.context['page_obj']), 5)
+
+    def test_benchmark_reservations_restores_indexes(self):
+        call_command('benchmark_reservations', '--iterations', '1', stdout=StringIO())
+        with connection.cursor() as cursor:
+            indexes = connection.introspection.get_constraints(cursor, BookReservation._meta.db_table)
+        names = {index.name for index in BookReservation._meta.indexes}
+        self.assertTrue(names <= set(indexes))
+
+
+class CatalogSearchTestCase(TestCase):
+    def setUp(self):
+        publisher = Publisher.objects.create(name='Просвещение', country='Россия', foundation_year=1930)
+        self.pushkin = Author.objects.create(full_name='Александр Пушкин', birth_date=date(1799, 6, 6))
+        poetry = Genre.objects.create(name='Поэзия')
+        self.onegin = create_book(publisher=publisher, description='Роман в стихах')
+        self.onegin.authors.add(self.pushkin)
+        self.onegin.genres.add(poetry)
+        self.war = create_book(title='Война и мир', isbn='9785177654321', description='Исторический роман')
+
+    def search(self, query):
+        response = self.client.get(reverse('library:book_list'), {'q': query})
+        return list(response.context['books'])
+
+    def test_search_by_title_prefix_and_related_names(self):
+        self.assertEqual(self.search('онег'), [self.onegin])
+        self.assertEqual(self.search('пушкин'), [self.onegin])
+        self.assertEqual(self.search('поэзия просвещение'), [self.onegin])
+
+    def test_ranking_prefers_title(self):
+        novel = create_book(title='Роман о любви', isbn='9785170000001')
+        results = self.search('роман')
+        self.assertEqual(results[0], novel)
+        self.assertEqual(set(results), {novel, self.onegin, self.war})
+
+    def test_index_follows_related_changes(self):
+        self.pushkin.full_name = 'А. С. Пушкин-Ганнибал'
+        self.pushkin.save()
+        self.assertEqual(self.search('ганнибал'), [self.onegin])
+        self.onegin.authors.clear()
+        self.assertEqual(self.search('ганнибал'), [])
+        self.war.delete()
+        self.assertEqual(self.search('война'), [])
+
+
+class ReaderSearchTestCase(TestCase):
+    def setUp(self):
+        self.ivanov = create_reader()
+        self.petrova = create_reader(
+            email='Petrova@Example.com', full_name='Петрова Алёна Сергеевна', phone='+7 (912) 555-44-33'
+        )
+
+    def search(self, query):
+        response = self.client.get(reverse('library:reader_list'), {'search': query})
+        return list(response.context['readers'])
+
+    def test_search_keys_are_normalized(self):
+        self.petrova.refresh_from_db()
+        self.assertEqual(self.petrova.search_name, 'петрова алена сергеевна')
+        self.assertEqual(self.petrova.search_email, 'petrova@example.com')
+        self.assertEqual(self.petrova.phone_digits, '79125554433')
+
+    def test_search_by_name_email_and_phone(self):
+        self.assertEqual(self.search('ИВАН'), [self.ivanov])
+        self.assertEqual(self.search('петрова алена'), [self.petrova])
+        self.assertEqual(self.search('petrova@'), [self.petrova])
+        self.assertEqual(self.search('+7 912 555'), [self.petrova])
+        self.assertEqual(self.search('сергеевна'), [self.petrova])
+        self.assertEqual(self.search('Алёна'), [self.petrova])
+        self.assertEqual(self.search('алена иванова'), [])
+
+    def test_results_are_paginated(self):
+        for number in range(30):
+            create_reader(email=f'reader{number}@example.com', full_name=f'Сидоров {number}')
+        response = self.client.get(reverse('library:reader_list'), {'search': 'сидоров'})
+        self.assertEqual(len(response.context['readers']), 25)
+        self.assertEqual(response.context['page_obj'].paginator.count, 30)
+
+    def test_lookup_returns_capped_json(self):
+        for number in range(30):
+            create_reader(email=f'reader{number}@example.com', full_name=f'Сидоров {number}')
+        url = reverse('library:reader_lookup')
+        with self.assertNumQueries(1):
+            results = self.client.get(url, {'q': 'сидоров'}).json()['results']
+        self.assertEqual(len(results), 20)
+        self.assertEqual(self.client.get(url, {'q': 'п'}).json(), {'results': []})
+        self.assertEqual(
+            self.client.get(url, {'q': 'petrova'}).json()['results'],
+            [{'id': self.petrova.pk, 'text': 'Петрова Алёна Сергеевна (Petrova@Example.com)'}],
+        )
+
+    def test_reserve_page_does_not_list_readers(self):
+        book = create_book()
+        response = self.client.get(reverse('library:book_reserve', args=[book.pk]))
+        self.assertNotContains(response, self.petrova.email)
+        self.assertContains(response, reverse('library:reader_lookup'))
+        self.assertContains(response, 'library/js/autocomplete.js')
+        response = self.client.post(reverse('library:book_reserve', args=[book.pk]),
+                                    {'book': book.pk, 'reader': self.petrova.pk})
+        self.assertEqual(response.status_code, 302)
+
+
+class CursorPaginationTestCase(TestCase):
+    def setUp(self):
+        # Одинаковые названия проверяют однозначность порядка по pk
+        for number in range(25):
+            create_book(title=f'Книга {number // 2:02d}', isbn=f'97800000000{number:02d}')
+
+    def walk(self, url):
+        pks, response = [], self.client.get(url, {'cursor': ''})
+        while True:
+            page = response.context['page_obj']
+            pks.extend(book.pk for book in page.object_list)
+            if not page.has_next():
+                return pks, response
+            response = self.client.get(url, {'cursor': page.next_cursor})
+
+    def test_cursor_pages_cover_ordering_without_gaps(self):
+        url = reverse('library:book_list')
+        pks, last_response = self.walk(url)
+        expected = list(Book.objects.order_by('title', 'pk').values_list('pk', flat=True))
+        self.assertEqual(pks, expected)
+
+        page = last_response.context['page_obj']
+        previous = self.client.get(url, {'cursor': page.previous_cursor}).context['page_obj']
+        self.assertEqual([book.pk for book in previous.object_list], expected[10:20])
+        self.assertTrue(previous.has_next())
+
+    def test_cursor_page_skips_count_query(self):
+        url = reverse('library:author_list')
+        with self.assertNumQueries(1):
+            self.client.get(url, {'cursor': ''})
+
+    def test_cursor_keeps_microseconds_of_tied_timestamps(self):
+        reader = create_reader()
+        books = list(Book.objects.order_by('pk')[:20])
+        BookReservation.objects.bulk_create([
+            BookReservation(book=book, reader=reader, status='completed', end_date=timezone.now())
+            for book in books
+        ])
+        # Половина броней делит одно время, остальные отличаются меньше чем на миллисекунду
+        moment = timezone.now().replace(microsecond=123456)
+        reservations = list(BookReservation.objects.order_by('pk'))
+        for number, reservation in enumerate(reservations):
+            reservation.reservation_date = moment + timedelta(microseconds=number * 100 if number % 2 else 0)
+        BookReservation.objects.bulk_update(reservations, ['reservation_date'])
+
+        paginator = CursorPaginator(BookReservation.objects.all(), ['-reservation_date'], 5)
+        pks, page = [], paginator.page()
+        while True:
+            pks.extend(reservation.pk for reservation in page)
+            if not page.has_next():
+                break
+            page = paginator.page(page.next_cursor)
+        expected = list(BookReservation.objects.order_by('-reservation_date', '-pk').values_list('pk', flat=True))
+        self.assertEqual(pks, expected)
+
+    def test_invalid_cursor_returns_404(self):
+        response = self.client.get(reverse('library:genre_list'), {'cursor': 'garbage'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_page_mode_is_default(self):
+        response = self.client.get(reverse('library:book_list'), {'page': 2})
+        self.assertEqual(response.context['page_obj'].number, 2)
+        self.assertContains(response, '?page=3')
+
+
+class BookCardCacheTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = Author.objects.create(full_name='Лев Толстой', birth_date=date(1828, 9, 9))
+        self.publisher = Publisher.objects.create(name='Просвещение', country='Россия', foundation_year=1930)
+        for number in range(5):
+            book = create_book(title=f'Том {number}', isbn=f'97800000001{number:02d}', publisher=self.publisher)
+            book.authors.add(self.author)
+
+    def test_cached_cards_skip_author_queries(self):
+        url = reverse('library:book_list')
+        with self.assertNumQueries(3):
+            # COUNT, страница книг с издательством, авторы для промахов кэша
+            self.client.get(url)
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertContains(response, 'Лев Толстой', count=5)
+
+    def test_related_changes_invalidate_cards(self):
+        url = reverse('library:book_list')
+        self.client.get(url)
+        self.author.full_name = 'Л. Н. Толстой'
+        self.author.save()
+        self.assertContains(self.client.get(url), 'Л. Н. Толстой', count=5)
+
+        self.publisher.name = 'Азбука'
+        self.publisher.save()
+        self.assertContains(self.client.get(url), 'Азбука', count=5)
+
+        book = Book.objects.get(title='Том 0')
+        book.authors.clear()
+        self.assertContains(self.client.get(url), 'Л. Н. Толстой', count=4)
+
+
+class ConditionalGetTestCase(TestCase):
+    def setUp(self):
+        self.author = Author.objects.create(full_name='Лев Толстой', birth_date=date(1828, 9, 9))
+        self.book = create_book(title='Война и мир')
+        self.book.authors.add(self.author)
+
+    def revalidate(self, url, response):
+        return self.client.get(url, headers={'if-none-match': response['ETag']})
+
+    def test_book_detail_not_modified_without_related_queries(self):
+        url = reverse('library:book_detail', args=[self.book.pk])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Last-Modified', response)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.revalidate(url, response).status_code, 304)
+
+    def test_book_etag_changes_with_author_and_availability(self):
+        url = reverse('library:book_detail', args=[self.book.pk])
+        response = self.client.get(url)
+        self.author.full_name = 'Л. Н. Толстой'
+        self.author.save()
+        response = self.revalidate(url, response)
+        self.assertEqual(response.status_code, 200)
+
+        BookReservation.objects.create(book=self.book, reader=create_reader())
+        self.assertEqual(self.revalidate(url, response).status_code, 200)
+
+    def test_author_etag_changes_when_book_removed(self):
+        url = reverse('library:author_detail', args=[self.author.pk])
+        response = self.client.get(url)
+        self.assertEqual(self.revalidate(url, response).status_code, 304)
+        self.book.authors.remove(self.author)
+        self.assertEqual(self.revalidate(url, response).status_code, 200)
+
+    def test_missing_object_still_404(self):
+        response = self.client.get(reverse('library:genre_detail', args=[999]))
+        self.assertEqual(response.status_code, 404)
+
+
+class ImportCatalogTestCase(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        Author.objects.create(full_name='Александр Пушкин', birth_date=date(1799, 6, 6))
+
+    def write(self, name, content):
+        path = os.path.join(self.tmpdir.name, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        return path
+
+    def test_import_csv_dedupes_related_objects(self):
+        path = self.write('catalog.csv', (
+            'isbn,title,description,publication_year,publisher,publisher_country,authors,genres\n'
+            '9785170000011,Евгений Онегин,Роман в стихах,1833,Просвещение,Россия,Александр Пушкин,Поэзия; Роман\n'
+            '9785170000012,Руслан и Людмила,,1820,Просвещение,Россия,Александр Пушкин|1799-06-06,Поэзия\n'
+            '9785170000012,Дубликат,,1820,,,,\n'
+            ',Без ISBN,,1820,,,,\n'
+        ))
+        call_command('import_catalog', path, '--batch-size', '2', stdout=StringIO())
+
+        self.assertEqual(Book.objects.count(), 2)
+        self.assertEqual(Author.objects.count(), 1)
+        self.assertEqual(Publisher.objects.count(), 1)
+        self.assertEqual(sorted(Genre.objects.values_list('name', flat=True)), ['Поэзия', 'Роман'])
+        onegin = Book.objects.get(isbn='9785170000011')
+        self.assertEqual(onegin.get_authors_list(), 'Александр Пушкин')
+        self.assertEqual(onegin.genres.count(), 2)
+        self.assertEqual(Author.objects.get().book_count, 2)
+        self.assertEqual(dict(Genre.objects.values_list('name', 'book_count')), {'Поэзия': 2, 'Роман': 1})
+        response = self.client.get(reverse('library:book_list'), {'q': 'людмила пушкин'})
+        self.assertEqual([book.title for book in response.context['books']], ['Руслан и Людмила'])
+
+    def test_import_jsonl_resumes_from_checkpoint(self):
+        lines = [
+            {'isbn': f'97851700001{number:02d}', 'title': f'Книга {number}', 'publication_year': 2000,
+             'authors': [{'full_name': 'Автор', 'birth_date': '1950-01-01'}], 'genres': ['Проза']}
+            for number in range(5)
+        ]
+        path = self.write('catalog.jsonl', '\n'.join(json.dumps(line, ensure_ascii=False) for line in lines))
+        checkpoint = os.path.join(self.tmpdir.name, 'catalog.checkpoint')
+        with open(checkpoint, 'w', encoding='utf-8') as f:
+            json.dump({'source': os.path.abspath(path), 'records': 3, 'stats': {'processed': 3}}, f)
+
+        call_command('import_catalog', path, '--checkpoint', checkpoint, stdout=StringIO())
+
+        self.assertEqual(sorted(Book.objects.values_list('title', flat=True)), ['Книга 3', 'Книга 4'])
+        self.assertEqual(Author.objects.get(full_name='Автор').birth_date, date(1950, 1, 1))
+        with open(checkpoint, encoding='utf-8') as f:
+            self.assertEqual(json.load(f)['records'], 5)
+
+
+class BenchmarkTestCase(TestCase):
+    def test_generate_catalog_and_benchmark_urls(self):
+        call_command(
+            'generate_catalog', '--books', '30', '--authors', '10', '--publishers', '3',
+            '--readers', '5', '--reservations', '40', stdout=StringIO(),
+        )
+        self.assertEqual(Book.objects.count(), 30)
+        self.assertEqual(Reader.objects.count(), 5)
+        self.assertTrue(all(book.authors.exists() for book in Book.objects.all()))
+        active = BookReservation.objects.filter(status='active').values_list('book_id', flat=True)
+        self.assertEqual(len(active), len(set(active)))
+        self.assertEqual(Book.objects.filter(active_reservations=1).count(), len(active))
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            output = os.path.join(tmpdir, 'urls.json')
+            call_command(
+                'benchmark_urls', '--iterations', '2', '--warmup', '0', '--host', 'testserver',
+                '--output', output, stdout=StringIO(),
+            )
+            with open(output, encoding='utf-8') as f:
+                results = json.load(f)['results']
+        self.assertNotIn('logout', results)
+        self.assertEqual(results['book_detail']['status'], 200)
+        self.assertEqual(results['book_detail']['count'], 2)
+        self.assertIn('p99_ms', results['book_list'])
+        self.assertGreater(results['book_list']['queries'], 0)
+
+
+@override_settings(SQL_INSTRUMENTATION_SAMPLE_RATE=1.0, SQL_INSTRUMENTATION_HEADERS=True,
+                   SQL_INSTRUMENTATION_N_PLUS_ONE_THRESHOLD=3)
+class QueryInstrumentationTestCase(TestCase):
+    def setUp(self):
+        report.reset()
+        self.addCleanup(report.reset)
+        self.books = [create_book(title=f'Книга {number}', isbn=f'97851700002{number:02d}') for number in range(4)]
+
+    def test_fingerprint_ignores_values(self):
+        self.assertEqual(
+            fingerprint("SELECT * FROM t WHERE id = 15 AND name = 'x' AND pk IN (%s, %s)"),
+            'SELECT * FROM t WHERE id = ? AND name = ? AND pk IN (...)',
+        )
+
+    def test_repeated_statements_are_flagged(self):
+        stats = QueryStats()
+        with connection.execute_wrapper(stats):
+            for book in self.books:
+                Book.objects.get(pk=book.pk)
+            Book.objects.get(pk=self.books[0].pk)
+        self.assertEqual(stats.count, 5)
+        self.assertEqual(stats.duplicates, 1)
+        suspects = stats.suspected_n_plus_one(3)
+        self.assertEqual(list(suspects.values()), [5])
+
+    def test_headers_and_report(self):
+        response = self.client.get(reverse('library:book_detail', args=[self.books[0].pk]))
+        self.assertGreater(int(response['X-DB-Query-Count']), 0)
+        self.assertIn('X-DB-Time-Ms', response)
+        self.assertEqual(response['X-DB-N-Plus-One'], '0')
+
+        admin = create_reader(email='admin@example.com')
+        admin.role = 'admin'
+        admin.save()
+        self.client.force_login(admin.user)
+        response = self.client.get(reverse('library:query_report'))
+        self.assertEqual(response.status_code, 200)
+        routes = [row['route'] for row in response.context['rows']]
+        self.assertIn('library:book_detail', routes)
+
+    def test_report_requires_admin(self):
+        self.client.force_login(create_reader().user)
+        self.assertEqual(self.client.get(reverse('library:query_report')).status_code, 403)
+
+
+class ExportTestCase(TestCase):
+    def setUp(self):
+        self.reader = create_reader()
+        self.book = create_book()
+        BookReservation.objects.create(book=self.book, reader=self.reader)
+        BookReservation.objects.create(book=create_book(title='Война и мир', isbn='9785170000001'),
+                                       reader=self.reader, status='completed')
+
+    def test_export_command_streams_filtered_csv(self):
+        out = StringIO()
+        call_command('export_data', 'reservations', '--status', 'active', '--chunk-size', '1', stdout=out)
+        rows = list(csv.DictReader(StringIO(out.getvalue())))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['book__title'], 'Евгений Онегин')
+        self.assertEqual(rows[0]['status'], 'active')
+
+    def test_export_view_jsonl_requires_admin(self):
+        url = reverse('library:export', args=['books'])
+        self.client.force_login(self.reader.user)
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        self.reader.role = 'admin'
+        self.reader.save()
+        response = self.client.get(url, {'format': 'jsonl'})
+        self.assertTrue(response.streaming)
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([row['title'] for row in rows], ['Евгений Онегин', 'Война и мир'])
+        self.assertEqual(rows[0]['active_reservations'], 1)
+        self.assertEqual(self.client.get(reverse('library:export', args=['users'])).status_code, 404)
+
+
+class CoverThumbnailTestCase(TestCase):
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=self.media.name, THUMBNAIL_SYNC=True)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        cache.clear()
+
+    def cover_file(self, name='cover.png', size=(600, 900)):
+        buffer = BytesIO()
+        Image.new('RGBA', size, (200, 30, 30, 255)).save(buffer, 'PNG')
+        return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+    def test_upload_builds_thumbnails_and_srcset(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            book = create_book(cover=self.cover_file())
+        book.refresh_from_db()
+        self.assertEqual(book.cover_thumbnails, {'source': book.cover.name, 'widths': [100, 200, 400]})
+        root = os.path.splitext(book.cover.name)[0]
+        for suffix in ('w100.webp', 'w400.jpg'):
+            self.assertTrue(os.path.exists(os.path.join(self.media.name, f'{root}.{suffix}')))
+        with Image.open(os.path.join(self.media.name, f'{root}.w200.webp')) as thumbnail:
+            self.assertEqual(thumbnail.size, (200, 300))
+
+        response = self.client.get(reverse('library:book_list'))
+        self.assertContains(response, 'type="image/webp"')
+        self.assertContains(response, f'{root}.w100.jpg')
+        self.assertNotContains(response, f'src="/media/{book.cover.name}"')
+
+    def test_backfill_command_and_cover_removal(self):
+        book = create_book(cover=self.cover_file(size=(80, 120)))
+        call_command('build_thumbnails', '--workers', '1', stdout=StringIO())
+        book.refresh_from_db()
+        self.assertEqual(book.cover_thumbnails['widths'], [80])
+        thumbnail = os.path.join(self.media.name, os.path.splitext(book.cover.name)[0] + '.w80.webp')
+        self.assertTrue(os.path.exists(thumbnail))
+
+        book.cover = None
+        with self.captureOnCommitCallbacks(execute=True):
+            book.save()
+        book.refresh_from_db()
+        self.assertEqual(book.cover_thumbnails, {})
+        self.assertFalse(os.path.exists(thumbnail))
+
+
+class StaticAssetsTestCase(TestCase):
+    def setUp(self):
+        static_root = tempfile.TemporaryDirectory()
+        self.addCleanup(static_root.cleanup)
+        settings_override = override_settings(
+            STATIC_ROOT=static_root.name,
+            STORAGES={
+                'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+                'staticfiles': {'BACKEND': 'library.storage.CompressedManifestStaticFilesStorage'},
+            },
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        call_command('collectstatic', interactive=False, verbosity=0)
+        self.css = staticfiles_storage.stored_name('library/css/style.css')
+
+    def test_collectstatic_writes_hashed_and_gzip_files(self):
+        self.assertRegex(self.css, r'^library/css/style\.[0-9a-f]{12}\.css$')
+        with staticfiles_storage.open(self.css) as original, staticfiles_storage.open(self.css + '.gz') as packed:
+            self.assertEqual(gzip.decompress(packed.read()), original.read())
+
+    def test_serves_precompressed_variant_with_immutable_cache(self):
+        response = self.client.get(f'/static/{self.css}', HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+
+        response = self.client.get(f'/static/{self.css}', HTTP_ACCEPT_ENCODING='gzip;q=0')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        response = self.client.get('/static/library/css/style.css')
+        self.assertNotIn('immutable', response['Cache-Control'])
+        self.assertEqual(self.client.get('/static/../manage.py').status_code, 404)
+
+    def test_hashed_names_are_built_once_per_manifest(self):
+        names = _hashed_names(staticfiles_storage)
+        self.assertIn(self.css, names)
+        self.assertIs(_hashed_names(staticfiles_storage), names)
+
+
+class RoleCacheTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.reader = create_reader()
+        self.user = self.reader.user
+
+    def test_role_is_resolved_once_and_cached(self):
+        with self.assertNumQueries(1):
+            role = resolve_role(self.user)
+        self.assertTrue(role.is_reader)
+        self.assertTrue(role.has_perm('reader.reserve_book'))
+        with self.assertNumQueries(0):
+            self.assertFalse(resolve_role(self.user).is_admin)
+
+    def test_role_change_invalidates_cache(self):
+        url = reverse('library:user-list')
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        self.reader.role = 'admin'
+        self.reader.save()
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertTrue(resolve_role(self.user).is_admin)
+
+        self.reader.delete()
+        role = resolve_role(self.user)
+        self.assertFalse(role.is_reader)
+        self.assertEqual(role.role, self.user.role)
+
+
+class RelatedBooksPaginationTestCase(TestCase):
+    def setUp(self):
+        self.publisher = Publisher.objects.create(name='Эксмо', country='Россия', foundation_year=1991)
+        self.author = Author.objects.create(full_name='Толстой Лев Николаевич', birth_date=date(1828, 9, 9))
+        for number in range(25):
+            book = create_book(title=f'Книга {number:02}', isbn=f'97851700{number:05}',
+                               publisher=self.publisher, description='Длинное описание')
+            book.authors.add(self.author)
+
+    def test_publisher_books_are_paginated_with_pruned_columns(self):
+        url = reverse('library:publisher_detail', args=[self.publisher.pk])
+        response = self.client.get(url)
+        books = response.context['published_books']
+        self.assertEqual(len(books), 20)
+        self.assertTrue(response.context['is_paginated'])
+        self.assertIn('description', books[0].get_deferred_fields())
+        self.assertContains(response, 'Толстой Лев Николаевич')
+
+        with self.assertNumQueries(5):
+            response = self.client.get(url, {'page': 2})
+        self.assertEqual([book.title for book in response.context['published_books']],
+                         ['Книга 20', 'Книга 21', 'Книга 22', 'Книга 23', 'Книга 24'])
+
+    def test_author_books_cursor_pages(self):
+        url = reverse('library:author_detail', args=[self.author.pk])
+        page = self.client.get(url, {'cursor': ''}).context['page_obj']
+        self.assertEqual(len(page), 20)
+        response = self.client.get(url, {'cursor': page.next_cursor})
+        self.assertEqual(len(response.context['books']), 5)
+        self.assertFalse(response.context['page_obj'].has_next())
+
+
+class BookCountTestCase(TestCase):
+    def setUp(self):
+        self.pushkin = Author.objects.create(full_name='Пушкин Александр Сергеевич', birth_date=date(1799, 6, 6))
+        self.gogol = Author.objects.create(full_name='Гоголь Николай Васильевич', birth_date=date(1809, 4, 1))
+        self.publisher = Publisher.objects.create(name='Эксмо', country='Россия', foundation_year=1991)
+        self.book = create_book(publisher=self.publisher)
+        self.book.authors.add(self.pushkin)
+
+    def counts(self, model):
+        return dict(model.objects.values_list('pk', 'book_count'))
+
+    def test_signals_keep_counts_in_sync(self):
+        self.assertEqual(self.counts(Author), {self.pushkin.pk: 1, self.gogol.pk: 0})
+        self.assertEqual(Publisher.objects.get().book_count, 1)
+
+        # Удаление несвязанного автора не должно уменьшать его счетчик
+        self.book.authors.remove(self.gogol)
+        self.gogol.book_set.add(self.book, create_book(title='Мертвые души', isbn='9785170000002'))
+        self.assertEqual(self.counts(Author), {self.pushkin.pk: 1, self.gogol.pk: 2})
+        self.book.authors.clear()
+        self.assertEqual(self.counts(Author), {self.pushkin.pk: 0, self.gogol.pk: 1})
+
+        self.book.publisher = None
+        self.book.save()
+        self.assertEqual(Publisher.objects.get().book_count, 0)
+        Book.objects.get(title='Мертвые души').delete()
+        self.assertEqual(self.counts(Author), {self.pushkin.pk: 0, self.gogol.pk: 0})
+
+    def test_rebuild_command_and_popular_sort(self):
+        Author.objects.update(book_count=7)
+        out = StringIO()
+        call_command('rebuild_book_counts', '--model', 'author', stdout=out)
+        self.assertIn('исправлено счетчиков 2', out.getvalue())
+        self.assertEqual(self.counts(Author), {self.pushkin.pk: 1, self.gogol.pk: 0})
+
+        response = self.client.get(reverse('library:author_list'), {'sort': 'popular'})
+        self.assertEqual(list(response.context['authors']), [self.pushkin, self.gogol])
+        response = self.client.get(reverse('library:author_list'))
+        self.assertEqual(list(response.context['authors']), [self.gogol, self.pushkin])
+
+
+class BookCountTransactionTestCase(TransactionTestCase):
+    def test_failed_counter_update_rolls_back_book_save(self):
+        first = Publisher.objects.create(name='Эксмо', country='Россия', foundation_year=1991)
+        second = Publisher.objects.create(name='АСТ', country='Россия', foundation_year=1990)
+        book = create_book(publisher=first)
+
+        book.publisher = second
+        with mock.patch('library.signals.adjust_book_counts', side_effect=[None, RuntimeError]):
+            with self.assertRaises(RuntimeError):
+                book.save()
+        self.assertEqual(Book.objects.get().publisher_id, first.pk)
+        self.assertEqual(dict(Publisher.objects.values_list('pk', 'book_count')), {first.pk: 1, second.pk: 0})
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class ReplicaRoutingTestCase(SimpleTestCase):
+    def route(self, request):
+        routed = {}
+
+        def view(request):
+            routed['read'] = ReplicaRouter().db_for_read(Book)
+            routed['session'] = ReplicaRouter().db_for_read(Session)
+            return HttpResponse()
+
+        response = ReplicaRoutingMiddleware(view)(request)
+        return routed, response
+
+    def test_reads_go_to_replica_until_a_write(self):
+        factory = RequestFactory()
+        self.assertIsNone(ReplicaRouter().db_for_read(Book))
+        routed, response = self.route(factory.get('/books/'))
+        self.assertEqual(routed, {'read': 'replica1', 'session': None})
+        self.assertNotIn(REPLICA_PIN_COOKIE, response.cookies)
+
+        routed, response = self.route(factory.post('/books/1/reserve/'))
+        self.assertIsNone(routed['read'])
+        self.assertEqual(ReplicaRouter().db_for_write(Book), 'default')
+        self.assertEqual(response.cookies[REPLICA_PIN_COOKIE]['max-age'], 10)
+
+        request = factory.get('/books/')
+        request.COOKIES[REPLICA_PIN_COOKIE] = '1'
+        self.assertIsNone(self.route(request)[0]['read'])
+
+
+class SyncReplicaTestCase(TestCase):
+    def test_sync_replica_copies_sqlite_database(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        path = os.path.join(tmpdir.name, 'replica.sqlite3')
+        call_command('sync_replica', '--path', path, stdout=StringIO())
+        replica = sqlite3.connect(path)
+        self.addCleanup(replica.close)
+        tables = {row[0] for row in replica.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        self.assertIn(Book._meta.db_table, tables)
+
+
+class SQLiteProfileTestCase(TestCase):
+    def test_pragmas_from_settings_are_applied(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA cache_size')
+            default_cache_size = cursor.fetchone()[0]
+            with override_settings(SQLITE_PRAGMAS={'cache_size': -4096}):
+                configure_connection(sender=None, connection=connection)
+            cursor.execute('PRAGMA cache_size')
+            self.assertEqual(cursor.fetchone()[0], -4096)
+            cursor.execute(f'PRAGMA cache_size = {default_cache_size}')
+
+    def test_alias_pragmas_override_settings(self):
+        self.assertEqual(sqlite_pragmas({'PRAGMAS': {'synchronous': 'FULL'}}), {'synchronous': 'FULL'})
+        with override_settings(SQLITE_PRAGMAS=PRODUCTION_PRAGMAS):
+            self.assertEqual(sqlite_pragmas({})['journal_mode'], 'WAL')
+
+
+class AsyncCatalogTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = Author.objects.create(full_name='Пушкин Александр Сергеевич', birth_date=date(1799, 6, 6))
+        self.genre = Genre.objects.create(name='Поэзия')
+        self.books = [create_book(title=f'Книга {number:02}', isbn=f'97851700{number:05}') for number in range(12)]
+        self.books[0].authors.add(self.author)
+        self.books[0].genres.add(self.genre)
+        self.reader = create_reader()
+
+    async def test_async_book_list_matches_sync_view(self):
+        url = reverse('library:async_book_list')
+        response = await self.async_client.get(url, {'page': 2})
+        self.assertEqual([book.title for book in response.context['books']], ['Книга 10', 'Книга 11'])
+        self.assertEqual(response.context['page_obj'].paginator.num_pages, 2)
+        # Номер за концом списка ведет на последнюю страницу, как Paginator.get_page
+        response = await self.async_client.get(url, {'page': 9})
+        self.assertEqual(response.context['page_obj'].number, 2)
+        response = await self.async_client.get(url, {'cursor': ''})
+        self.assertEqual(len(response.context['books']), 10)
+        self.assertEqual(response['X-DB-Query-Count'], '2')
+
+    async def test_async_book_detail_and_conditional_get(self):
+        url = reverse('library:async_book_detail', args=[self.books[0].pk])
+        response = await self.async_client.get(url)
+        self.assertContains(response, 'Пушкин Александр Сергеевич')
+        self.assertContains(response, 'Поэзия')
+        response = await self.async_client.get(url, headers={'If-None-Match': response['ETag']})
+        self.assertEqual(response.status_code, 304)
+        response = await self.async_client.get(reverse('library:async_book_detail', args=[999999]))
+        self.assertEqual(response.status_code, 404)
+
+    async def test_async_reader_lookup(self):
+        response = await self.async_client.get(reverse('library:async_reader_lookup'), {'q': 'иванов'})
+        self.assertEqual(response.json()['results'], [{'id': self.reader.pk, 'text': self.reader.lookup_label}])
+
+
+class CatalogApiTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.publisher = Publisher.objects.create(name='Азбука', country='Россия', foundation_year=1995)
+        self.authors = [
+            Author.objects.create(full_name=name, birth_date=date(1897, 10, 15)) for name in ('Ильф Илья', 'Петров Евгений')
+        ]
+        self.genre = Genre.objects.create(name='Сатира')
+        self.books = [
+            create_book(title=f'Книга {number:02}', isbn=f'97851700{number:05}', publisher=self.publisher)
+            for number in range(5)
+        ]
+        self.books[0].authors.add(*self.authors)
+        self.books[0].genres.add(self.genre)
+
+    def test_sparse_fields_and_aggregated_arrays(self):
+        url = reverse('library:api', args=['books'])
+        with self.assertNumQueries(3):
+            response = self.client.get(url, {'fields': 'title,authors,genres', 'limit': 2})
+        data = response.json()
+        self.assertEqual(data['results'][0], {
+            'title': 'Книга 00',
+            'authors': [{'id': author.pk, 'full_name': author.full_name} for author in self.authors],
+            'genres': [{'id': self.genre.pk, 'name': 'Сатира'}],
+        })
+        self.assertEqual(data['results'][1]['authors'], [])
+        self.assertIsNone(data['previous'])
+
+        response = self.client.get(data['next'])
+        self.assertEqual([row['title'] for row in response.json()['results']], ['Книга 02', 'Книга 03'])
+
+    def test_batch_lookup_keeps_requested_order(self):
+        ids = [self.books[3].pk, self.books[1].pk]
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('library:api', args=['books']), {
+                'ids': ','.join(map(str, ids)), 'fields': 'id,publisher',
+            })
+        self.assertEqual(response.json()['results'], [{'id': pk, 'publisher': 'Азбука'} for pk in ids])
+
+    def test_other_resources_and_errors(self):
+        response = self.client.get(reverse('library:api', args=['publishers']))
+        self.assertEqual(response.json()['results'], [
+            {'id': self.publisher.pk, 'name': 'Азбука', 'country': 'Россия', 'book_count': 5}
+        ])
+        url = reverse('library:api', args=['authors'])
+        self.assertEqual(self.client.get(url, {'fields': 'title'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'ids': '1,x'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'cursor': 'мусор'}).status_code, 400)
+        self.assertEqual(self.client.post(url).status_code, 405)
+        self.assertEqual(self.client.get(reverse('library:api', args=['users'])).status_code, 404)
+
+
+class LibraryAdminTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.reader = create_reader()
+        self.books = [create_book(isbn=f'978517000{number:04}') for number in range(3)]
+        self.reservations = [reserve_book(book.pk, self.reader) for book in self.books]
+        admin_user = User.objects.create_superuser('staff', 'staff@example.com', 'testpass123', role='admin')
+        self.client.force_login(admin_user)
+
+    def run_action(self, model, action, pks):
+        url = reverse(f'admin:library_{model}_changelist')
+        return self.client.post(url, {'action': action, '_selected_action': [str(pk) for pk in pks]})
+
+    def test_complete_and_extend_reservations_in_bulk(self):
+        first, second, third = self.reservations
+        end_date = third.end_date
+        self.assertEqual(self.run_action('bookreservation', 'extend_reservations', [third.pk]).status_code, 302)
+        third.refresh_from_db()
+        self.assertEqual(third.end_date, end_date + timedelta(days=14))
+
+        self.run_action('bookreservation', 'complete_reservations', [first.pk, second.pk])
+        statuses = dict(BookReservation.objects.values_list('pk', 'status'))
+        self.assertEqual(statuses, {first.pk: 'completed', second.pk: 'completed', third.pk: 'active'})
+        availability = dict(Book.objects.values_list('pk', 'active_reservations'))
+        self.assertEqual(availability, {self.books[0].pk: 0, self.books[1].pk: 0, self.books[2].pk: 1})
+
+    def test_changelists_render(self):
+        for model in ('bookreservation', 'reader'):
+            response = self.client.get(reverse(f'admin:library_{model}_changelist'), {'q': 'иванов'})
+            self.assertEqual(response.status_code, 200)
+            self.assertContains(response, 'Иванов Иван Иванович')
+
+    def test_bulk_role_change_invalidates_cache(self):
+        self.assertTrue(resolve_role(self.reader.user).is_reader)
+        self.run_action('reader', 'make_guests', [self.reader.pk])
+        self.assertEqual(resolve_role(self.reader.user).role, 'guest')
+        # Права администратора массово не выдаются
+        self.assertNotContains(self.client.get(reverse('admin:library_reader_changelist')), 'make_admins')
+
+
+class CatalogAutocompleteTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.authors = [
+            Author.objects.create(full_name=name, birth_date=date(1900, 1, 1))
+            for name in ('Толстой Лев', 'Тургенев Иван', 'Чехов Антон')
+        ]
+        self.publisher = Publisher.objects.create(name='Эксмо', country='Россия', foundation_year=1991)
+        self.book = create_book(publisher=self.publisher)
+        self.book.authors.add(self.authors[2])
+
+    def test_search_name_and_lookup(self):
+        self.assertEqual(self.authors[0].search_name, 'толстой лев')
+        response = self.client.get(reverse('library:catalog_lookup', args=['authors']), {'q': 'Т'})
+        self.assertEqual([row['text'] for row in response.json()['results']], ['Толстой Лев', 'Тургенев Иван'])
+        response = self.client.get(reverse('library:catalog_lookup', args=['publishers']), {'q': 'эксмо'})
+        self.assertEqual(response.json()['results'], [{'id': self.publisher.pk, 'text': 'Эксмо (Россия)'}])
+        self.assertEqual(self.client.get(reverse('library:catalog_lookup', args=['readers'])).status_code, 404)
+
+    def test_book_form_renders_only_selected_authors(self):
+        html = str(BookForm(instance=self.book)['authors'])
+        self.assertIn('Чехов Антон', html)
+        self.assertNotIn('Толстой Лев', html)
+        self.assertIn(reverse('library:catalog_lookup', args=['authors']), html)
+
+        form = BookForm(data={
+            'title': 'Новая книга', 'isbn': '9785170000999', 'publication_year': 2000,
+            'authors': [self.authors[0].pk], 'genres': [],
+        })
+        form.fields['genres'].required = False
+        self.assertTrue(form.is_valid(), form.errors)
+
+    def test_admin_autocomplete_and_paginated_filter(self):
+        admin_user = User.objects.create_superuser('staff', 'staff@example.com', 'testpass123', role='admin')
+        self.client.force_login(admin_user)
+        response = self.client.get(reverse('admin:autocomplete'), {
+            'app_label': 'library', 'model_name': 'book', 'field_name': 'authors', 'term': 'тур',
+        })
+        self.assertEqual([row['text'] for row in response.json()['results']], ['Тургенев Иван'])
+
+        response = self.client.get(reverse('admin:library_book_change', args=[self.book.pk]))
+        self.assertContains(response, 'Чехов Антон')
+        self.assertNotContains(response, 'Толстой Лев')
+
+        url = reverse('admin:library_book_changelist')
+        with mock.patch.object(BookCountFieldListFilter, 'per_page', 2):
+            self.assertContains(self.client.get(url), 'authors_page=2')
+            response = self.client.get(url, {'authors_page': 2})
+        self.assertContains(response, 'Тургенев Иван (0)')
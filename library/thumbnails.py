@@ -0,0 +1,130 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from .models import Book
+
+# Ширины миниатюр в пикселях; больше ширины оригинала не растягиваем
+WIDTHS = (100, 200, 400)
+
+# Формат -> (формат Pillow, расширение, параметры сохранения)
+FORMATS = {
+    'webp': ('WEBP', 'webp', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', 'jpg', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def thumbnail_name(name, width, fmt):
+    """Путь миниатюры рядом с оригиналом: book_covers/x.jpg -> book_covers/x.w100.webp"""
+    root, _ = os.path.splitext(name)
+    return f'{root}.w{width}.{FORMATS[fmt][1]}'
+
+
+def thumbnail_widths(thumbnails, name):
+    """Ширины готовых миниатюр, если они построены именно для этого файла обложки"""
+    if not name or not thumbnails or thumbnails.get('source') != name:
+        return []
+    return thumbnails.get('widths', [])
+
+
+def render_thumbnails(name, storage=default_storage):
+    """Строит миниатюры обложки во всех форматах и возвращает их ширины"""
+    with storage.open(name, 'rb') as source:
+        image = Image.open(source)
+        image = ImageOps.exif_transpose(image)
+        image.load()
+    if image.mode not in ('RGB', 'L'):
+        # JPEG не поддерживает прозрачность: подкладываем белый фон
+        background = Image.new('RGB', image.size, 'white')
+        rgba = image.convert('RGBA')
+        background.paste(rgba, mask=rgba.getchannel('A'))
+        image = background
+
+    widths = [width for width in WIDTHS if width < image.width] or [image.width]
+    for width in widths:
+        height = max(1, round(image.height * width / image.width))
+        resized = image.resize((width, height), Image.LANCZOS)
+        for fmt, (pil_format, _, options) in FORMATS.items():
+            buffer = BytesIO()
+            resized.save(buffer, pil_format, **options)
+            target = thumbnail_name(name, width, fmt)
+            if storage.exists(target):
+                storage.delete(target)
+            storage.save(target, ContentFile(buffer.getvalue()))
+    return widths
+
+
+def delete_thumbnails(thumbnails, storage=default_storage):
+    source = (thumbnails or {}).get('source')
+    for width in (thumbnails or {}).get('widths', []):
+        for fmt in FORMATS:
+            target = thumbnail_name(source, width, fmt)
+            if storage.exists(target):
+                storage.delete(target)
+
+
+def build_for_book(book_id, force=False):
+    """Приводит миниатюры книги в соответствие с текущей обложкой.
+
+    Возвращает True, если миниатюры были перестроены или удалены.
+    """
+    book = Book.objects.filter(pk=book_id).only('cover', 'cover_thumbnails').first()
+    if book is None:
+        return False
+    name = book.cover.name if book.cover else ''
+    if not force and (thumbnail_widths(book.cover_thumbnails, name) or not (name or book.cover_thumbnails)):
+        return False
+
+    thumbnails = {}
+    if name:
+        thumbnails = {'source': name, 'widths': render_thumbnails(name)}
+    previous = book.cover_thumbnails
+    if previous and previous.get('source') != name:
+        delete_thumbnails(previous)
+    # Условие на cover: обложку могли заменить, пока строились миниатюры
+    same_cover = Q(cover=name) if name else Q(cover='') | Q(cover__isnull=True)
+    Book.objects.filter(same_cover, pk=book_id).update(
+        cover_thumbnails=thumbnails,
+        card_version=F('card_version') + 1,
+        updated_at=timezone.now(),
+    )
+    return True
+
+
+def _run(book_id):
+    try:
+        build_for_book(book_id)
+    finally:
+        # Поток пула живет долго: соединение с БД закрываем сами
+        close_old_connections()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'THUMBNAIL_WORKERS', 2),
+                thread_name_prefix='thumbnails',
+            )
+        return _executor
+
+
+def schedule(book_id):
+    """Ставит построение миниатюр в пул потоков после коммита транзакции"""
+    if getattr(settings, 'THUMBNAIL_SYNC', False):
+        transaction.on_commit(lambda: build_for_book(book_id))
+    else:
+        transaction.on_commit(lambda: get_executor().submit(_run, book_id))
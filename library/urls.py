@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import async_views, views
 
 app_name = 'library'
 
@@ -23,12 +23,15 @@ urlpatterns = [
     # Читатели
     path('readers/', views.reader_list, name='reader_list'),
     path('readers/add/', views.reader_create, name='reader_create'),
+    path('readers/lookup/', views.reader_lookup, name='reader_lookup'),
+    path('lookup/<str:kind>/', views.catalog_lookup, name='catalog_lookup'),
     
     # Бронирования
     path('reservations/', views.ReservationListView.as_view(), name='reservation_list'),
     path('reservations/add/', views.BookReservationCreateView.as_view(), name='reservation_create'),
     path('books/<int:book_id>/reserve/', views.book_reserve, name='book_reserve'),
     path('readers/<int:reader_id>/reservations/', views.reader_reservations, name='reader_reservations'),
+    path('export/<str:dataset>/', views.export_view, name='export'),
     
     # Авторы, издательства, жанры
     path('authors/', views.AuthorListView.as_view(), name='author_list'),
@@ -37,5 +40,14 @@ urlpatterns = [
     path('publishers/<int:pk>/', views.PublisherDetailView.as_view(), name='publisher_detail'),
     path('genres/', views.GenreListView.as_view(), name='genre_list'),
 path('manage/users/', views.user_list_view, name='user-list'),
+    path('manage/queries/', views.query_report_view, name='query_report'),
     path('genres/<int:pk>/', views.GenreDetailView.as_view(), name='genre_detail'),
+
+    # Асинхронные версии каталога для ASGI (project/asgi.py)
+    path('async/books/', async_views.book_list, name='async_book_list'),
+    path('async/books/<int:pk>/', async_views.book_detail, name='async_book_detail'),
+    path('async/readers/lookup/', async_views.reader_lookup, name='async_reader_lookup'),
+
+    # JSON-API каталога для мобильного приложения и киосков (library/api.py)
+    path('api/<str:resource>/', views.api_view, name='api'),
 ]
\ No newline at end of file
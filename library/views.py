@@ -1,20 +1,35 @@
 from django.views.generic import ListView, DetailView, CreateView
+from django.db.models import Prefetch
 from .models import Book, Author, Publisher, Genre, Reader, BookReservation, User
+from . import api
+from .conditions import catalog_condition
+from .exports import DATASETS, FORMATS, filter_reservations, iter_export
+from .instrumentation import report as query_report
+from .pagination import CursorPaginationMixin, InvalidCursor, paginate
+from .roles import resolve_role
+from .search import BookSearchResults, search_by_name, search_readers
+from .services import ReservationConflict, reserve_book
 from .forms import BookForm, ReaderForm, BookReservationForm, LoginForm, UserCreationForm, ReaderRegistrationForm
 from django.shortcuts import render, redirect, get_object_or_404
-from django.db.models import Q, Case, When, Value, IntegerField
+from django.core.paginator import Paginator
 from django.utils import timezone
-from django.http import HttpResponseForbidden
+from django.http import Http404, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
 from django.contrib.auth import authenticate, login, logout
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
+from django.utils.decorators import method_decorator
 from functools import wraps
+def _request_role(request):
+    # Роль кладет RoleMiddleware; без него вычисляем на месте
+    role = getattr(request, 'library_role', None)
+    return role if role is not None else resolve_role(request.user)
+
 def reader_required(view_func):
     @wraps(view_func)
     def wrapper(request, *args, **kwargs):
         if not request.user.is_authenticated:
             return HttpResponseForbidden("Требуется аутентификация")
-        if not hasattr(request.user, 'reader') or not request.user.reader.is_reader:
+        if not _request_role(request).is_reader:
             return HttpResponseForbidden("Доступ запрещен")
         return view_func(request, *args, **kwargs)
     return wrapper
@@ -22,7 +37,7 @@ def reader_required(view_func):
 def admin_required(view_func):
     @wraps(view_func)
     def wrapper(request, *args, **kwargs):
-        if not request.user.is_authenticated or not request.user.reader.is_admin:
+        if not request.user.is_authenticated or not _request_role(request).is_admin:
             return HttpResponseForbidden("Доступ запрещен")
         return view_func(request, *args, **kwargs)
     return wrapper
@@ -113,12 +128,11 @@ def book_reserve(request, book_id):
     """Бронирование конкретной книги"""
     book = get_object_or_404(Book, pk=book_id)
     
-    # Проверяем доступность книги
-    if book.reservations.filter(status='active').exists():
+    # Проверяем доступность книги (денормализованный счетчик, без запроса к броням)
+    if not book.is_available():
         return render(request, 'library/book_reserve.html', {
             'book': book,
             'title': f'Бронирование книги: {book.title}',
-            'readers': Reader.objects.all(),
             'min_date': timezone.now().date(),
             'default_date': timezone.now().date(),
         })
@@ -126,30 +140,25 @@ def book_reserve(request, book_id):
     if request.method == 'POST':
         form = BookReservationForm(request.POST, book=book)
         if form.is_valid():
-            reservation = form.save(commit=False)
-            reservation.book = book
-            reservation.status = 'active'
-            
-            # Обрабатываем дату из формы
+            # Бронь длится две недели от выбранной даты (или от текущей)
+            start = timezone.now()
             booking_date_str = request.POST.get('booking_date')
             if booking_date_str:
                 try:
                     from datetime import datetime
                     booking_date = datetime.strptime(booking_date_str, '%Y-%m-%d').date()
-                    reservation.reservation_date = timezone.make_aware(
-                        datetime.combine(booking_date, datetime.min.time())
-                    )
-                    reservation.end_date = reservation.reservation_date + timezone.timedelta(days=14)
+                    start = timezone.make_aware(datetime.combine(booking_date, datetime.min.time()))
                 except (ValueError, TypeError):
                     # Если дата некорректна, используем текущую дату
-                    reservation.reservation_date = timezone.now()
-                    reservation.end_date = reservation.reservation_date + timezone.timedelta(days=14)
-            else:
-                reservation.reservation_date = timezone.now()
-                reservation.end_date = reservation.reservation_date + timezone.timedelta(days=14)
+                    pass
             
-            reservation.save()
-            return redirect('library:reader_reservations', reader_id=reservation.reader.pk)
+            reader = form.cleaned_data['reader']
+            try:
+                reserve_book(book.pk, reader, end_date=start + timezone.timedelta(days=14))
+            except ReservationConflict as e:
+                form.add_error(None, str(e))
+            else:
+                return redirect('library:reader_reservations', reader_id=reader.pk)
     else:
         form = BookReservationForm(book=book)
     
@@ -157,61 +166,75 @@ def book_reserve(request, book_id):
         'form': form,
         'book': book,
         'title': f'Бронирование книги: {book.title}',
-        'readers': Reader.objects.all(),
         'min_date': timezone.now().date(),
         'default_date': timezone.now().date(),
     })
 
 def reader_reservations(request, reader_id):
-    """Список броней конкретного читателя с сортировкой"""
+    """Брони читателя: сначала активные, затем постраничная история"""
     reader = get_object_or_404(Reader, pk=reader_id)
     current_date = timezone.now()
-    
-    reservations = BookReservation.objects.filter(reader=reader).annotate(
-        status_priority=Case(
-            When(
-                status='active',
-                end_date__lt=current_date,
-                then=Value(1)
-            ),
-            When(
-                status='active',
-                end_date__gte=current_date,
-                then=Value(2)
-            ),
-            When(
-                status='completed',
-                then=Value(3)
-            ),
-            When(
-                status='canceled',
-                then=Value(4)
-            ),
-            output_field=IntegerField(),
-        )
-    ).order_by('status_priority', '-reservation_date')
+    reservations = reader.reservations.select_related('book').prefetch_related('book__authors')
+
+    # Активные брони читаются из индекса (reader, status, end_date) уже упорядоченными;
+    # история выбирается по тому же индексу через IN по статусам (exclude его не использует)
+    active_reservations = reservations.filter(status='active').order_by('end_date')
+    history = reservations.filter(status__in=BookReservation.CLOSED_STATUSES).order_by('-end_date', '-pk')
+    page_obj = Paginator(history, 25).get_page(request.GET.get('page'))
     
     return render(request, 'library/reader_reservations.html', {
-        'reservations': reservations,
+        'active_reservations': active_reservations,
+        'page_obj': page_obj,
+        'is_paginated': page_obj.has_other_pages(),
         'reader': reader,
         'current_date': current_date,
     })
 
+# Сколько читателей отдает автодополнение и с какой длины запроса начинает искать
+READER_LOOKUP_LIMIT = 20
+READER_LOOKUP_MIN_LENGTH = 2
+
+def lookup_readers(query):
+    """Читатели для автодополнения; общий запрос для sync- и async-представления"""
+    if len(query) < READER_LOOKUP_MIN_LENGTH:
+        return Reader.objects.none()
+    readers = search_readers(query).order_by('search_name', 'pk').only('full_name', 'email')
+    return readers[:READER_LOOKUP_LIMIT]
+
+def reader_lookup(request):
+    """JSON-поиск читателей по началу ФИО, email или телефона для автодополнения"""
+    readers = lookup_readers(request.GET.get('q', '').strip())
+    return JsonResponse({
+        'results': [{'id': reader.pk, 'text': reader.lookup_label} for reader in readers]
+    })
+
+# Справочники для автодополнения в BookForm
+CATALOG_LOOKUP_MODELS = {'authors': Author, 'publishers': Publisher, 'genres': Genre}
+CATALOG_LOOKUP_LIMIT = 20
+
+def catalog_lookup(request, kind):
+    """JSON-поиск авторов, издательств или жанров по началу имени для автодополнения"""
+    model = CATALOG_LOOKUP_MODELS.get(kind)
+    if model is None:
+        raise Http404("Неизвестный справочник")
+    query = request.GET.get('q', '').strip()
+    rows = model.objects.none()
+    if query:
+        rows = search_by_name(model.objects.all(), query).order_by('search_name', 'pk')[:CATALOG_LOOKUP_LIMIT]
+    return JsonResponse({
+        'results': [{'id': obj.pk, 'text': str(obj)} for obj in rows]
+    })
+
 def reader_list(request):
-    """Список читателей с поиском"""
-    search_query = request.GET.get('search', '')
-    
-    if search_query:
-        readers = Reader.objects.filter(
-            Q(full_name__icontains=search_query) |
-            Q(email__icontains=search_query) |
-            Q(phone__icontains=search_query)
-        )
-    else:
-        readers = Reader.objects.all()
+    """Список читателей с поиском по началу ФИО, email или телефона"""
+    search_query = request.GET.get('search', '').strip()
+    readers = search_readers(search_query)
+    page_obj = Paginator(readers, 25).get_page(request.GET.get('page'))
     
     return render(request, 'library/reader_list.html', {
-        'readers': readers,
+        'readers': page_obj.object_list,
+        'page_obj': page_obj,
+        'is_paginated': page_obj.has_other_pages(),
         'search_query': search_query
     })
 
@@ -238,25 +261,59 @@ class BookReservationCreateView(CreateView):
     success_url = '/reservations/'
 
     def form_valid(self, form):
-        form.instance.status = 'active'
-        return super().form_valid(form)
-
-class ReservationListView(ListView):
+        try:
+            self.object = reserve_book(form.cleaned_data['book'].pk, form.cleaned_data['reader'])
+        except ReservationConflict as e:
+            form.add_error(None, str(e))
+            return self.form_invalid(form)
+        return redirect(self.get_success_url())
+
+class ReservationListView(CursorPaginationMixin, ListView):
     """Список всех бронирований"""
     model = BookReservation
     template_name = "library/bookreservation_list.html"
     context_object_name = "reservations"
     ordering = ['-reservation_date']
+    paginate_by = 50
     
     def get_queryset(self):
-        status_filter = self.request.GET.get('status', '')
-        queryset = super().get_queryset()
-        
-        if status_filter:
-            queryset = queryset.filter(status=status_filter)
-        
+        queryset = filter_reservations(super().get_queryset(), self.request.GET)
         return queryset.select_related('book', 'reader')
 
+@admin_required
+def export_view(request, dataset):
+    """Потоковая выгрузка броней, книг или читателей в CSV/JSONL"""
+    fmt = request.GET.get('format', 'csv')
+    if dataset not in DATASETS or fmt not in FORMATS:
+        raise Http404("Неизвестная выгрузка")
+    response = StreamingHttpResponse(iter_export(dataset, fmt, request.GET), content_type=FORMATS[fmt])
+    response['Content-Disposition'] = f'attachment; filename="{dataset}.{fmt}"'
+    return response
+
+def api_view(request, resource):
+    """JSON-API каталога только для чтения: ?fields=, ?ids=, ?cursor=, ?limit="""
+    if request.method not in ('GET', 'HEAD'):
+        return JsonResponse({'error': 'Поддерживается только GET'}, status=405, headers={'Allow': 'GET, HEAD'})
+    if resource not in api.RESOURCES:
+        raise Http404("Неизвестный ресурс")
+    try:
+        data = api.fetch(resource, request.GET)
+    except (api.ApiError, InvalidCursor) as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    def link(cursor):
+        if cursor is None:
+            return None
+        params = request.GET.copy()
+        params['cursor'] = cursor
+        return f'{request.path}?{params.urlencode()}'
+
+    return JsonResponse({
+        'results': data['results'],
+        'next': link(data['next_cursor']),
+        'previous': link(data['previous_cursor']),
+    }, json_dumps_params={'ensure_ascii': False})
+
 class BookCreateView(CreateView):
     model = Book
     form_class = BookForm
@@ -287,7 +344,7 @@ class BookCreateForAuthorView(CreateView):
         response = super().form_valid(form)
         return response
 
-class BookListView(ListView):
+class BookListView(CursorPaginationMixin, ListView):
     model = Book
     template_name = "library/book_list.html"
     context_object_name = "books"
@@ -295,8 +352,20 @@ class BookListView(ListView):
     paginate_by = 10
     
     def get_queryset(self):
-        return Book.objects.select_related('publisher').prefetch_related('authors', 'genres')
+        # Авторы подгружаются тегом book_cards только для карточек, которых нет в кэше
+        queryset = Book.objects.select_related('publisher')
+        self.search_query = self.request.GET.get('q', '').strip()
+        if self.search_query:
+            # Полнотекстовый поиск: результаты упорядочены по релевантности
+            return BookSearchResults(self.search_query, queryset)
+        return queryset
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['search_query'] = self.search_query
+        return context
 
+@method_decorator(catalog_condition('book'), name='get')
 class BookDetailView(DetailView):
     model = Book
     template_name = "library/book_detail.html"
@@ -305,39 +374,81 @@ class BookDetailView(DetailView):
     def get_queryset(self):
         return Book.objects.select_related('publisher').prefetch_related('authors', 'genres')
 
-class AuthorListView(ListView):
+class RelatedBooksMixin:
+    """Постраничный список книг автора, издательства или жанра для DetailView.
+
+    Загружаются только колонки, которые выводит шаблон, поэтому число и
+    объем запросов не зависят от того, сколько книг у сущности.
+    """
+
+    books_lookup = None
+    books_context_name = 'books'
+    books_paginate_by = 20
+    books_ordering = ['title']
+    books_fields = ['title', 'publication_year', 'publisher__name']
+    books_with_authors = True
+
+    def get_related_books(self):
+        books = Book.objects.filter(**{self.books_lookup: self.object}).select_related('publisher').only(*self.books_fields)
+        if self.books_with_authors:
+            books = books.prefetch_related(Prefetch('authors', queryset=Author.objects.only('full_name')))
+        return books
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        page_obj = paginate(self.request, self.get_related_books(), self.books_ordering, self.books_paginate_by)
+        context.update({
+            self.books_context_name: page_obj.object_list,
+            'page_obj': page_obj,
+            'is_paginated': page_obj.has_other_pages(),
+        })
+        return context
+
+class PopularSortMixin:
+    """Сортировка по числу книг при ``?sort=popular`` (индекс по -book_count)"""
+
+    def get_ordering(self):
+        ordering = super().get_ordering()
+        if self.request.GET.get('sort') == 'popular':
+            return ['-book_count', *ordering]
+        return ordering
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['sort'] = self.request.GET.get('sort', '')
+        return context
+
+class AuthorListView(PopularSortMixin, CursorPaginationMixin, ListView):
     model = Author
     template_name = "library/author_list.html"
     context_object_name = "authors"
     ordering = ["full_name"]
     paginate_by = 10
 
-class AuthorDetailView(DetailView):
+@method_decorator(catalog_condition('author'), name='get')
+class AuthorDetailView(RelatedBooksMixin, DetailView):
     model = Author
     template_name = "library/author_detail.html"
     context_object_name = "author"
     
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        context["books"] = Book.objects.filter(authors=self.object).select_related('publisher').prefetch_related('genres')
-        return context
+    books_lookup = 'authors'
+    books_with_authors = False
 
-class PublisherListView(ListView):
+class PublisherListView(PopularSortMixin, CursorPaginationMixin, ListView):
     model = Publisher
     template_name = "library/publisher_list.html"
     context_object_name = "publishers"
     ordering = ["name"]
     paginate_by = 10
 
-class PublisherDetailView(DetailView):
+@method_decorator(catalog_condition('publisher'), name='get')
+class PublisherDetailView(RelatedBooksMixin, DetailView):
     model = Publisher
     template_name = "library/publisher_detail.html"
     context_object_name = "publisher"
     
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        context["published_books"] = Book.objects.filter(publisher=self.object).select_related('publisher').prefetch_related('authors', 'genres')
-        return context
+    books_lookup = 'publisher'
+    books_context_name = 'published_books'
 
 # Удалены дублирующие определения GenreListView и GenreDetailView
 
@@ -359,19 +470,29 @@ def user_list_view(request):
         'title': 'Управление пользователями'
     })
 
-class GenreListView(ListView):
+@admin_required
+def query_report_view(request):
+    """Сводка SQL-запросов по маршрутам с подозрениями на N+1"""
+    if request.method == 'POST':
+        query_report.reset()
+        messages.info(request, 'Статистика запросов сброшена.')
+        return redirect('library:query_report')
+    return render(request, 'admin/query_report.html', {
+        'rows': query_report.rows(),
+        'title': 'Статистика SQL-запросов'
+    })
+
+class GenreListView(PopularSortMixin, CursorPaginationMixin, ListView):
     model = Genre
     template_name = "library/genre_list.html"
     context_object_name = "genres"
     ordering = ["name"]
     paginate_by = 15
 
-class GenreDetailView(DetailView):
+@method_decorator(catalog_condition('genre'), name='get')
+class GenreDetailView(RelatedBooksMixin, DetailView):
     model = Genre
     template_name = "library/genre_detail.html"
     context_object_name = "genre"
 
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        context["books"] = Book.objects.filter(genres=self.object).select_related('publisher').prefetch_related('authors', 'genres')
-        return context
\ No newline at end of file
+    books_lookup = 'genres'
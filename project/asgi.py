@@ -5,6 +5,9 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
+
+Асинхронные страницы каталога (library/async_views.py) не занимают поток
+на время ожидания клиента: uvicorn project.asgi:application
 """
 
 import os
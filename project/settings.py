@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -42,10 +43,13 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'library.middleware.QueryInstrumentationMiddleware',
+    'library.middleware.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'library.middleware.RoleMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -80,6 +84,62 @@ DATABASES = {
     }
 }
 
+# Реплики только для чтения: LIBRARY_DB_REPLICAS=/path/replica1.sqlite3,/path/replica2.sqlite3
+# Локально реплику заменяет копия основной базы: python manage.py sync_replica
+DATABASE_REPLICAS = []
+for number, path in enumerate(filter(None, os.environ.get('LIBRARY_DB_REPLICAS', '').split(',')), start=1):
+    DATABASES[f'replica{number}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': path.strip(),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica{number}')
+
+# Профиль БД: LIBRARY_DB_PROFILE=production включает WAL и прагмы (library/db.py),
+# постоянные соединения и BEGIN IMMEDIATE для записи (ожидание вместо
+# мгновенной ошибки «database is locked» при конкурентных бронированиях)
+DATABASE_PROFILE = os.environ.get('LIBRARY_DB_PROFILE', 'development')
+SQLITE_PRAGMAS = {}
+if DATABASE_PROFILE == 'production':
+    from library.db import PRODUCTION_PRAGMAS
+    SQLITE_PRAGMAS = PRODUCTION_PRAGMAS
+    for alias, database in DATABASES.items():
+        database.update({
+            'CONN_MAX_AGE': 600,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {'timeout': 20},
+        })
+    DATABASES['default']['OPTIONS']['transaction_mode'] = 'IMMEDIATE'
+
+DATABASE_ROUTERS = ['library.routers.ReplicaRouter']
+# Сколько секунд после записи пользователь читает с основной базы
+REPLICA_PIN_SECONDS = 10
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+# Кэш должен быть общим для всех процессов (Memcached/Redis в продакшене):
+# в нем хранятся карточки книг и роли пользователей, сбрасываемые сигналами
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'library',
+        'OPTIONS': {
+            'MAX_ENTRIES': 20000,
+        },
+    }
+}
+
+
+# SQL instrumentation
+# Доля запросов, для которых считаются SQL-запросы (в продакшене — выборочно)
+SQL_INSTRUMENTATION_SAMPLE_RATE = 1.0 if DEBUG else 0.01
+# Сколько одинаковых по шаблону запросов за один HTTP-запрос считать N+1
+SQL_INSTRUMENTATION_N_PLUS_ONE_THRESHOLD = 5
+# Заголовки X-DB-* в ответах
+SQL_INSTRUMENTATION_HEADERS = DEBUG
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -120,6 +180,29 @@ STATICFILES_DIRS = [
     BASE_DIR / "static",
     BASE_DIR / "library/static",
 ]
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+# В продакшене collectstatic добавляет хэш в имена файлов и пишет рядом .gz/.br
+# (library/storage.py), а library/static.py отдает их с Cache-Control: immutable
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': (
+            'django.contrib.staticfiles.storage.StaticFilesStorage' if DEBUG
+            else 'library.storage.CompressedManifestStaticFilesStorage'
+        ),
+    },
+}
+
+# Media files (обложки книг и их миниатюры)
+MEDIA_URL = '/media/'
+MEDIA_ROOT = BASE_DIR / 'media'
+
+# Миниатюры обложек строятся в фоне пулом потоков (см. library/thumbnails.py)
+THUMBNAIL_WORKERS = 2
+THUMBNAIL_SYNC = False
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
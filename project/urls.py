@@ -14,10 +14,16 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.conf import settings
+from django.conf.urls.static import static
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
+
+from library.static import serve_static
 
 urlpatterns = [
     path('admin/', admin.site.urls),
-    path('', include('library.urls'))
-]
+    path('', include('library.urls')),
+    # Собранная статика (в DEBUG ее раньше перехватывает runserver)
+    re_path(rf'^{settings.STATIC_URL.lstrip("/")}(?P<path>.+)$', serve_static),
+] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)